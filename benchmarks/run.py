@@ -0,0 +1,177 @@
+"""
+Benchmarks for the parse, convert and query paths over synthetic OLGA files.
+
+    python -m benchmarks.run --times 200 --nodes 500 --json results.json
+    python -m benchmarks.run --compare results.json
+
+The files are written and cached, and each benchmark is run, in a fresh
+interpreter of its own. Linux carries ru_maxrss over fork and exec, so this
+process is kept no larger than a bare import and each peak RSS is the
+benchmark's own. The best wall time of `--repeat` runs is reported. With
+`--compare` a benchmark more than `--tolerance` slower (or larger) than the
+saved results is flagged and the exit status is 1.
+"""
+import argparse
+import json
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+
+from benchmarks.synthetic import write_ppl, write_tpl
+from src.metrics import peak_rss_mb
+from src.stu_flo import Cache, open_PPL, open_TPL, store_ppl_in_hdf5
+
+
+def bench_parse_ppl(files):
+    open_PPL(files["ppl"])
+
+
+def bench_parse_ppl_parallel(files):
+    open_PPL(files["ppl"], parallel=True)
+
+
+def bench_parse_tpl(files):
+    open_TPL(files["tpl"])
+
+
+def bench_convert_ppl(files):
+    store_ppl_in_hdf5(files["ppl"], files["dir"] / "convert.h5")
+
+
+def bench_convert_tpl(files):
+    store_ppl_in_hdf5(files["tpl"], files["dir"] / "convert.h5")
+
+
+def bench_open_cached(files):
+    open_PPL(files["ppl"], cache=files["cache"])
+
+
+def bench_open_lazy(files):
+    open_PPL(files["ppl"], lazy=True, cache=files["cache"]).close()
+
+
+def bench_query_lazy(files):
+    with open_PPL(files["ppl"], lazy=True, cache=files["cache"]) as ppl:
+        t0, t1 = ppl.times[len(ppl.times) // 4], ppl.times[len(ppl.times) // 2]
+        for branch in ppl.branches:
+            x = branch.values[0][-1]
+            symbols = [c.symbol for c in ppl.catalog if c.branch == branch.name][:3]
+            for symbol in symbols:
+                ppl.get(symbol, branch.name, t0=t0, t1=t1, x0=0.25 * x, x1=0.75 * x)
+
+
+def bench_query_trend(files):
+    tpl = open_TPL(files["tpl"], lazy=True, cache=files["cache"])
+    for c in tpl.catalog[:10]:
+        tpl.get(c.symbol, c.location, t0=tpl.times[0], t1=tpl.times[len(tpl.times) // 10])
+    tpl.close()
+
+
+benchmarks = {
+    name[len("bench_"):]: f for name, f in sorted(globals().items()) if name.startswith("bench_")
+}
+
+
+def _measure(name, files, repeat):
+    best = np.inf
+    for _ in range(repeat):
+        start = time.perf_counter()
+        benchmarks[name](files)
+        best = min(best, time.perf_counter() - start)
+    return {"seconds": best, "peak_rss_mb": peak_rss_mb()}
+
+
+def _files(directory):
+    directory = Path(directory)
+    return {
+        "dir": directory,
+        "cache": directory / "cache",
+        "ppl": directory / "bench.ppl",
+        "tpl": directory / "bench.tpl",
+    }
+
+
+def _prepare(files, args):
+    write_ppl(files["ppl"], args.branches, args.nodes, args.variables, args.times)
+    write_tpl(files["tpl"], args.branches, args.nodes, args.trends, 30 * args.times)
+    for key in ["ppl", "tpl"]:
+        Cache(files["cache"]).get(files[key])
+
+
+def _run_isolated(argv):
+    output = subprocess.run(
+        [sys.executable, "-m", "benchmarks.run"] + argv,
+        cwd=Path(__file__).resolve().parent.parent,
+        check=True,
+        capture_output=True,
+        text=True,
+    ).stdout
+    return json.loads(output.splitlines()[-1])
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--branches", type=int, default=3)
+    parser.add_argument("--nodes", type=int, default=500)
+    parser.add_argument("--variables", type=int, default=10, help="PPL catalog items per branch")
+    parser.add_argument("--trends", type=int, default=80, help="TPL catalog items")
+    parser.add_argument("--times", type=int, default=100, help="PPL time steps (TPL gets 30x)")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--only", nargs="*", default=None, help="benchmarks to run")
+    parser.add_argument("--json", default=None, help="write results to this file")
+    parser.add_argument("--compare", default=None, help="results file to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.2)
+    parser.add_argument("--child", default=None, help=argparse.SUPPRESS)
+    parser.add_argument("--dir", default=None, help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.child == "prepare":
+        _prepare(_files(args.dir), args)
+        print(json.dumps(None))
+        return 0
+    if args.child:
+        print(json.dumps(_measure(args.child, _files(args.dir), args.repeat)))
+        return 0
+
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        files = _files(tmp)
+        sizing = ["--branches", args.branches, "--nodes", args.nodes, "--variables", args.variables]
+        sizing += ["--trends", args.trends, "--times", args.times]
+        _run_isolated(["--child", "prepare", "--dir", tmp] + [str(a) for a in sizing])
+        sizes = {k: files[k].stat().st_size / 2 ** 20 for k in ["ppl", "tpl"]}
+        print(f"ppl {sizes['ppl']:.1f} MB, tpl {sizes['tpl']:.1f} MB")
+        for name in args.only or benchmarks:
+            results[name] = _run_isolated(["--child", name, "--dir", tmp, "--repeat", str(args.repeat)])
+            print(f"{name:<20} {results[name]['seconds']:8.3f} s {results[name]['peak_rss_mb']:8.1f} MB")
+
+    output = {"parameters": {k: v for k, v in vars(args).items() if k not in ("json", "compare", "only", "child", "dir")}, "results": results}
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(output, f, indent=2)
+    if args.compare:
+        return _compare(results, args.compare, args.tolerance)
+    return 0
+
+
+def _compare(results, path, tolerance):
+    with open(path) as f:
+        baseline = json.load(f)["results"]
+    regressions = 0
+    for name, result in results.items():
+        if name not in baseline:
+            continue
+        for metric in ["seconds", "peak_rss_mb"]:
+            ratio = result[metric] / baseline[name][metric]
+            if ratio > 1 + tolerance:
+                regressions += 1
+                print(f"REGRESSION {name} {metric}: {baseline[name][metric]:.3f} -> {result[metric]:.3f} ({ratio:.2f}x)")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,112 @@
+"""
+Synthetic OLGA profile (.ppl) and trend (.tpl) plots in the layout of the
+files in tests/test_files, sized by branches, nodes, variables and time steps.
+"""
+import argparse
+
+import numpy as np
+
+boundary_variables = [
+    ("GG", "(KG/S)", "Gas mass flow"),
+    ("GLT", "(KG/S)", "Total liquid mass flow"),
+    ("GT", "(KG/S)", "Total mass flow"),
+    ("QG", "(M3/S)", "Gas volume flow"),
+    ("QLT", "(M3/S)", "Total liquid volume flow"),
+    ("UG", "(M/S)", "Gas velocity"),
+]
+
+section_variables = [
+    ("PT", "(PA)", "Pressure"),
+    ("TM", "(C)", "Fluid temperature"),
+    ("HOL", "(-)", "Holdup (liquid volume fraction)"),
+    ("TWS", "(C)", "Inner wall surface temperature"),
+    ("TWSO", "(C)", "Outer wall surface temperature"),
+    ("ROG", "(KG/M3)", "Density of gas"),
+    ("ROL", "(KG/M3)", "Density of liquid"),
+    ("TU", "(C)", "Ambient temperature"),
+]
+
+
+def _variables(n):
+    """
+    The first n variables, alternating BOUNDARY and SECTION kinds until the
+    BOUNDARY ones run out, so even a small catalog has both kinds.
+    """
+    pool = []
+    for i in range(max(len(boundary_variables), len(section_variables))):
+        pool += [("BOUNDARY", v) for v in boundary_variables[i : i + 1]]
+        pool += [("SECTION", v) for v in section_variables[i : i + 1]]
+    out = []
+    for i in range(n):
+        kind, (symbol, units, description) = pool[i % len(pool)]
+        suffix = "" if i < len(pool) else str(i // len(pool))
+        out.append((kind, f"{symbol}{suffix}", units, description))
+    return out
+
+
+def _header(f, plot, branches):
+    f.write(
+        f"'OLGA 7.2.2.0'\n{plot}\nINPUT FILE\n'synthetic.inp'\nRESTART FILE\n'restart.rsw'\n"
+        "DATE\n'2015-01-15 10:08:04'\nPROJECT\n'myproject'\nTITLE\n'synthetic'\n"
+        f"AUTHOR\n'GP'\nNETWORK\n{len(branches)}\n"
+    )
+    f.write("GEOMETRY ' (M)  '\n" if plot == "PROFILE PLOT" else "GEOMETRY' (M)  '\n")
+    for name, count in branches:
+        length = np.linspace(0.0, 50.0 * count, count + 1)
+        elevation = -120.0 + 10.0 * np.sin(length / 1000.0)
+        f.write(f"BRANCH\n'{name}'\n{count}\n")
+        for values in (length, elevation):
+            for i in range(0, len(values), 5):
+                f.write("".join(f"{v:13.3f} " for v in values[i : i + 5]) + "\n")
+
+
+def write_ppl(path, branches=3, nodes=500, variables=10, times=100, seed=0):
+    """Write a profile plot with `variables` catalog items per branch."""
+    rng = np.random.default_rng(seed)
+    layout = [(f"branch_{b}", nodes) for b in range(branches)]
+    catalog = [(name, count, v) for name, count in layout for v in _variables(variables)]
+    with open(path, "w") as f:
+        _header(f, "PROFILE PLOT", layout)
+        f.write(f"CATALOG \n{len(catalog)}\n")
+        for name, _, (kind, symbol, units, description) in catalog:
+            f.write(f"{symbol} '{kind}:' 'BRANCH:' '{name}' '{units}' '{description}'\n")
+        f.write("TIME SERIES  ' (S)  '\n")
+        for t in range(times):
+            f.write(f"{t * 60.0:e}\n")
+            for _, count, (kind, _, _, _) in catalog:
+                n = count + 1 if kind == "BOUNDARY" else count
+                np.savetxt(f, rng.random((1, n)) * 1.0e6, fmt="%e", newline=" \n")
+    return path
+
+
+def write_tpl(path, branches=3, nodes=500, variables=80, times=3000, seed=0):
+    """Write a trend plot with `variables` POSITION trends."""
+    rng = np.random.default_rng(seed)
+    layout = [(f"branch_{b}", nodes) for b in range(branches)]
+    catalog = [("GLOBAL", "", "HT", "(S)", "Time step")] + [
+        ("POSITION:", f"POS_{i // 8}", symbol, units, description)
+        for i, (_, symbol, units, description) in enumerate(_variables(variables - 1))
+    ]
+    with open(path, "w") as f:
+        _header(f, "TIME PLOT", layout)
+        f.write(f"CATALOG \n{len(catalog)}\n")
+        for kind, location, symbol, units, description in catalog:
+            where = f"'{kind}'" if not location else f"'{kind}' '{location}'"
+            f.write(f"{symbol} {where} '{units}' '{description}'\n")
+        f.write("TIME SERIES  ' (S)  '\n")
+        rows = np.column_stack([np.arange(times) * 60.0, rng.random((times, len(catalog))) * 1.0e6])
+        np.savetxt(f, rows, fmt="%e")
+    return path
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("path")
+    parser.add_argument("--branches", type=int, default=3)
+    parser.add_argument("--nodes", type=int, default=500)
+    parser.add_argument("--variables", type=int, default=None)
+    parser.add_argument("--times", type=int, default=None)
+    args = parser.parse_args()
+    write = write_tpl if args.path.endswith(".tpl") else write_ppl
+    sizes = {k: v for k, v in vars(args).items() if k != "path" and v is not None}
+    write(args.path, **sizes)
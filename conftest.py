@@ -0,0 +1,2 @@
+# Puts the repository root on sys.path so tests import src and tests.helpers
+# however pytest is started.
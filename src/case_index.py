@@ -0,0 +1,162 @@
+import os
+import sqlite3
+import time
+from pathlib import Path
+
+import h5py
+
+header_fields = [
+    "plot",
+    "olga_version",
+    "input_file",
+    "pvt_file",
+    "restart_file",
+    "project",
+    "title",
+    "author",
+    "date",
+    "network",
+]
+
+statistics = ["min", "max", "mean", "time_min", "time_max", "position_min", "position_max", "final"]
+
+comparisons = [">", ">=", "<", "<=", "="]
+
+schema = f"""
+CREATE TABLE IF NOT EXISTS cases (
+    id INTEGER PRIMARY KEY,
+    path TEXT UNIQUE NOT NULL,
+    store TEXT,
+    size INTEGER,
+    mtime_ns INTEGER,
+    {", ".join(f"{f} TEXT" for f in header_fields)},
+    n_times INTEGER,
+    t_start REAL,
+    t_end REAL,
+    indexed_at REAL
+);
+CREATE TABLE IF NOT EXISTS variables (
+    case_id INTEGER NOT NULL REFERENCES cases(id) ON DELETE CASCADE,
+    item INTEGER NOT NULL,
+    symbol TEXT,
+    kind TEXT,
+    location TEXT,
+    units TEXT,
+    description TEXT,
+    {", ".join(f"{s} REAL" for s in statistics)},
+    PRIMARY KEY (case_id, item)
+);
+CREATE INDEX IF NOT EXISTS variables_symbol ON variables(symbol);
+"""
+
+
+class CaseIndex:
+    """
+    SQLite index of converted cases: the OLGA header fields, the catalog and
+    the summary statistics written by HDF5Writer, so screening questions
+    over many cases ("which runs ever had QLT above 5?") are answered
+    without opening their stores or plot files.
+    """
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.connection = sqlite3.connect(self.path, timeout=30)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute("PRAGMA foreign_keys=ON")
+        self.connection.executescript(schema)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def close(self):
+        self.connection.close()
+
+    def contains(self, path):
+        """True if `path` is indexed as it is now on disk."""
+        path = Path(path).resolve()
+        stat = path.stat()
+        row = self.connection.execute(
+            "SELECT size, mtime_ns FROM cases WHERE path = ?", (str(path),)
+        ).fetchone()
+        return row == (stat.st_size, stat.st_mtime_ns)
+
+    def add(self, path, store):
+        """Index the plot file `path` from its converted HDF5 `store`."""
+        path = Path(path).resolve()
+        stat = path.stat()
+        with h5py.File(store, "r") as hdf5:
+            header = {f: _text(hdf5.attrs.get(f)) for f in header_fields}
+            times = hdf5["time"]
+            n_times = len(times)
+            t_start, t_end = (float(times[0]), float(times[-1])) if n_times else (None, None)
+            catalog = hdf5["catalog"]
+            fields = {f: list(catalog[f].asstr()[...]) for f in catalog}
+            summary = hdf5.get("summary")
+            stats = {s: summary[s][...] if summary is not None else None for s in statistics}
+        locations = fields.get("branch", fields.get("location"))
+        with self.connection:
+            self.connection.execute("DELETE FROM cases WHERE path = ?", (str(path),))
+            case_id = self.connection.execute(
+                f"INSERT INTO cases (path, store, size, mtime_ns, {', '.join(header_fields)}, "
+                f"n_times, t_start, t_end, indexed_at) VALUES ({', '.join(['?'] * (len(header_fields) + 8))})",
+                [str(path), str(store), stat.st_size, stat.st_mtime_ns]
+                + [header[f] for f in header_fields]
+                + [n_times, t_start, t_end, time.time()],
+            ).lastrowid
+            self.connection.executemany(
+                f"INSERT INTO variables VALUES ({', '.join(['?'] * (7 + len(statistics)))})",
+                [
+                    [case_id, n, fields["symbol"][n], fields["kind"][n], locations[n],
+                     fields["units"][n], fields["description"][n]]
+                    + [None if stats[s] is None else _number(stats[s][n]) for s in statistics]
+                    for n in range(len(fields["symbol"]))
+                ],
+            )
+
+    def remove(self, path):
+        with self.connection:
+            self.connection.execute("DELETE FROM cases WHERE path = ?", (str(Path(path).resolve()),))
+
+    def query(self, sql, parameters=()):
+        """Rows of any SQL query over the `cases` and `variables` tables."""
+        return self.connection.execute(sql, parameters).fetchall()
+
+    def screen(self, symbol, statistic="max", comparison=">", threshold=0.0, location=None):
+        """
+        (path, location, value) of every indexed variable `symbol` (at
+        `location`, if given) whose `statistic` compares true with
+        `threshold`, e.g. screen("QLT", "max", ">", 5.0).
+        """
+        if statistic not in statistics:
+            raise Exception(f"Unknown statistic {statistic}, expected one of {statistics}.")
+        if comparison not in comparisons:
+            raise Exception(f"Unknown comparison {comparison}, expected one of {comparisons}.")
+        sql = (
+            f"SELECT cases.path, variables.location, variables.{statistic} FROM variables "
+            f"JOIN cases ON cases.id = variables.case_id "
+            f"WHERE variables.symbol = ? AND variables.{statistic} {comparison} ?"
+        )
+        parameters = [symbol, threshold]
+        if location is not None:
+            sql += " AND variables.location = ?"
+            parameters.append(location)
+        return self.query(sql + " ORDER BY cases.path, variables.item", parameters)
+
+
+def index_path_in(directory):
+    return Path(os.environ.get("STU_FLOW_INDEX", Path(directory) / "cases.sqlite"))
+
+
+def _text(value):
+    if value is None:
+        return None
+    return value.decode() if isinstance(value, bytes) else str(value)
+
+
+def _number(value):
+    value = float(value)
+    return None if value != value else value  # NaN as NULL
@@ -0,0 +1,126 @@
+from pathlib import Path
+
+import numpy as np
+
+from .stu_flo import Cache, open_PPL, open_TPL
+
+
+class CaseSet:
+    """
+    The same variables across many runs. Each case is opened lazily from its
+    cached store on first use and only the requested window is read; values
+    are interpolated onto a common time (and position) grid where the cases'
+    grids differ and stacked with the case as the first axis.
+    """
+
+    def __init__(self, paths, cache=None, dtype=np.float64):
+        self.paths = [Path(p) for p in paths]
+        self.names = [p.stem for p in self.paths]
+        self.cache = cache if isinstance(cache, Cache) else Cache(cache)
+        self.dtype = dtype
+        self._plots = {}
+
+    def __len__(self):
+        return len(self.paths)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def close(self):
+        for plot in self._plots.values():
+            plot.close()
+        self._plots = {}
+
+    def plot(self, case):
+        """The lazily opened PPL or TPL of `case` (a name or an index)."""
+        path = self.paths[case if isinstance(case, int) else self.names.index(case)]
+        if path not in self._plots:
+            open_plot = open_TPL if path.suffix.lower() == ".tpl" else open_PPL
+            self._plots[path] = open_plot(path, self.dtype, lazy=True, cache=self.cache)
+        return self._plots[path]
+
+    def profiles(self, symbol, branch, times=None, positions=None, t0=None, t1=None):
+        """
+        (case, time, position) values of `symbol` in `branch` of every case.
+        `times` and `positions` default to the first case's grid within the
+        range all cases cover (and t0 <= time <= t1); grid points outside a
+        case's own grid are extrapolated linearly. Returns
+        (times, positions, values).
+        """
+        cases = [self.plot(n) for n in range(len(self))]
+        if times is None:
+            times = _common_grid([c.times for c in cases], t0, t1)
+        if positions is None:
+            items = [c._item(symbol, branch) for c in cases]
+            positions = _common_grid(
+                [c.branch(branch).positions(i.kind) for c, i in zip(cases, items)]
+            )
+        values = np.empty((len(cases), len(times), len(positions)))
+        for n, case in enumerate(cases):
+            t, x, v = case.get(symbol, branch, *_cover(case.times, times), axes=True)
+            values[n] = _interp(_interp(v, t, times, axis=0), x, positions, axis=1)
+        return times, positions, values
+
+    def trends(self, symbol, location="", times=None, t0=None, t1=None):
+        """(case, time) values of the trend `symbol` at `location`; returns (times, values)."""
+        cases = [self.plot(n) for n in range(len(self))]
+        if times is None:
+            times = _common_grid([c.times for c in cases], t0, t1)
+        values = np.empty((len(cases), len(times)))
+        for n, case in enumerate(cases):
+            t, v = case.get(symbol, location, *_cover(case.times, times), axes=True)
+            values[n] = _interp(v, t, times, axis=0)
+        return times, values
+
+    @staticmethod
+    def envelope(values, percentiles=(10, 50, 90)):
+        """
+        Statistics across the case axis of stacked `values`: a dict of `min`,
+        `max`, `mean` and each of `percentiles`, each shaped like one case.
+        """
+        result = {
+            "min": values.min(axis=0),
+            "max": values.max(axis=0),
+            "mean": values.mean(axis=0),
+        }
+        for p, v in zip(percentiles, np.percentile(values, percentiles, axis=0)):
+            result[p] = v
+        return result
+
+
+def _common_grid(grids, x0=None, x1=None):
+    # the first grid within the range covered by all of them
+    lo = max(g[0] for g in grids)
+    hi = min(g[-1] for g in grids)
+    if x0 is not None:
+        lo = max(lo, x0)
+    if x1 is not None:
+        hi = min(hi, x1)
+    grid = np.asarray(grids[0])
+    return grid[(grid >= lo) & (grid <= hi)]
+
+
+def _cover(grid, x):
+    # (t0, t1) of the points of `grid` needed to interpolate onto `x`
+    if len(x) == 0:
+        return grid[0], grid[0]
+    i0 = max(int(np.searchsorted(grid, x[0], side="right")) - 1, 0)
+    i1 = min(int(np.searchsorted(grid, x[-1], side="left")), len(grid) - 1)
+    return grid[i0], grid[i1]
+
+
+def _interp(values, x, new_x, axis):
+    """Linear interpolation of `values` along `axis` from `x` onto `new_x`."""
+    if len(x) == len(new_x) and np.array_equal(x, new_x):
+        return values
+    if len(x) == 1:
+        return np.repeat(values, len(new_x), axis=axis)
+    i = np.clip(np.searchsorted(x, new_x, side="right") - 1, 0, len(x) - 2)
+    w = (new_x - x[i]) / (x[i + 1] - x[i])
+    shape = [1] * values.ndim
+    shape[axis] = len(new_x)
+    w = w.reshape(shape)
+    return np.take(values, i, axis=axis) * (1 - w) + np.take(values, i + 1, axis=axis) * w
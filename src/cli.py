@@ -0,0 +1,214 @@
+import argparse
+import glob
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+
+from .case_index import comparisons, statistics
+from .metrics import metrics
+from .stu_flo import Cache, compressions, verify_precision
+
+
+def main(argv=None):
+    """
+    Command line entry point, e.g.
+
+        python -m src.cli convert "runs/**/*.ppl" "runs/**/*.tpl" --out cache --jobs 8
+    """
+    args = _parser().parse_args(argv)
+    return args.func(args)
+
+
+def _parser():
+    parser = argparse.ArgumentParser(prog="stu-flow")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    convert = commands.add_parser(
+        "convert", help="convert .ppl/.tpl files to HDF5 stores in a cache directory"
+    )
+    convert.add_argument("paths", nargs="+", help="files or glob patterns (** recurses)")
+    convert.add_argument("--out", default=None, help="cache directory (default: the stu_flow cache)")
+    convert.add_argument("--jobs", type=int, default=os.cpu_count(), help="worker processes")
+    convert.add_argument("--float32", action="store_true", help="store values as float32")
+    convert.add_argument("--compression", choices=compressions, default=None, help="store compression (default gzip)")
+    convert.add_argument(
+        "--verify", action="store_true", help="check stored values round back to the printed ones"
+    )
+    convert.add_argument("--force", action="store_true", help="convert files already in the cache")
+    convert.add_argument("--metrics", default=None, help="write per-stage timings of each file to this JSON file")
+    convert.set_defaults(func=convert_command)
+
+    export = commands.add_parser("export", help="export .ppl/.tpl files to partitioned Parquet datasets")
+    export.add_argument("paths", nargs="+", help="files or glob patterns (** recurses)")
+    export.add_argument("--out", required=True, help="directory of the profiles/ and trends/ datasets")
+    export.add_argument("--jobs", type=int, default=os.cpu_count(), help="worker processes")
+    export.add_argument("--float32", action="store_true", help="store values as float32")
+    export.set_defaults(func=export_command)
+
+    serve = commands.add_parser("serve", help="convert files dropped into a directory into the cache")
+    serve.add_argument("directory", help="directory to watch")
+    serve.add_argument("--out", default=None, help="cache directory (default: the stu_flow cache)")
+    serve.add_argument("--jobs", type=int, default=os.cpu_count(), help="worker processes")
+    serve.add_argument("--queue", type=int, default=64, help="most files waiting to be converted")
+    serve.add_argument("--interval", type=float, default=2.0, help="seconds between directory scans")
+    serve.add_argument("--float32", action="store_true", help="store values as float32")
+    serve.add_argument("--compression", choices=compressions, default=None, help="store compression (default gzip)")
+    serve.add_argument("--port", type=int, default=8765, help="port of the http://127.0.0.1:PORT/status endpoint")
+    serve.set_defaults(func=serve_command)
+
+    screen = commands.add_parser("screen", help="find converted cases by a variable's summary statistics")
+    screen.add_argument("symbol", help="variable, e.g. QLT")
+    screen.add_argument("statistic", choices=statistics)
+    screen.add_argument("comparison", choices=comparisons)
+    screen.add_argument("threshold", type=float)
+    screen.add_argument("--location", default=None, help="branch or trend location")
+    screen.add_argument("--out", default=None, help="cache directory (default: the stu_flow cache)")
+    screen.set_defaults(func=screen_command)
+    return parser
+
+
+def expand_paths(patterns):
+    paths = []
+    for pattern in patterns:
+        matches = sorted(glob.glob(pattern, recursive=True)) if glob.has_magic(pattern) else [pattern]
+        paths.extend(p for p in matches if p not in paths)
+    return paths
+
+
+def convert_command(args):
+    dtype = np.float32 if args.float32 else np.float64
+    cache = Cache(args.out, compression=args.compression)
+    paths = expand_paths(args.paths)
+    if not args.force:
+        skipped = [p for p in paths if os.path.exists(p) and cache.contains(p, dtype)]
+        for p in skipped:
+            print(f"skipped   {p} (already converted)")
+        paths = [p for p in paths if p not in skipped]
+
+    failed = 0
+    start = time.perf_counter()
+    total_bytes = 0
+    reports = {}
+    with ProcessPoolExecutor(max_workers=max(1, args.jobs)) as pool:
+        futures = {
+            pool.submit(
+                convert_file,
+                p,
+                cache.directory,
+                cache.max_bytes,
+                dtype,
+                args.force,
+                cache.compression,
+                args.verify,
+                args.metrics is not None,
+            ): p
+            for p in paths
+        }
+        for future in as_completed(futures):
+            path = futures[future]
+            try:
+                size, seconds, error, report = future.result()
+            except Exception as e:
+                failed += 1
+                print(f"failed    {path}: {type(e).__name__}: {e}", file=sys.stderr)
+                continue
+            total_bytes += size
+            if report is not None:
+                reports[path] = report
+            print(f"converted {path} {size / 2 ** 20:.1f} MB in {seconds:.2f} s ({_rate(size, seconds)})")
+            if error is not None:
+                status = "ok" if error <= 0.5 else "FAILED"
+                print(f"verified  {path} max error {error:.3f} of the last printed digit ({status})")
+                failed += error > 0.5
+
+    seconds = time.perf_counter() - start
+    if args.metrics:
+        with open(args.metrics, "w") as f:
+            json.dump(reports, f, indent=2)
+    print(
+        f"{len(paths) - failed} converted, {failed} failed, "
+        f"{total_bytes / 2 ** 20:.1f} MB in {seconds:.2f} s ({_rate(total_bytes, seconds)})"
+    )
+    return 1 if failed else 0
+
+
+def export_command(args):
+    # pyarrow is only needed for exporting
+    from .parquet import export_parquet
+
+    dtype = np.float32 if args.float32 else np.float64
+    failed = 0
+    with ProcessPoolExecutor(max_workers=max(1, args.jobs)) as pool:
+        futures = {pool.submit(export_parquet, p, args.out, dtype=dtype): p for p in expand_paths(args.paths)}
+        for future in as_completed(futures):
+            path = futures[future]
+            try:
+                files = future.result()
+            except Exception as e:
+                failed += 1
+                print(f"failed    {path}: {type(e).__name__}: {e}", file=sys.stderr)
+                continue
+            print(f"exported  {path} to {len(files)} files")
+    return 1 if failed else 0
+
+
+def serve_command(args):
+    from .service import IngestService
+
+    service = IngestService(
+        args.directory,
+        Cache(args.out, compression=args.compression),
+        jobs=max(1, args.jobs),
+        queue_size=args.queue,
+        interval=args.interval,
+        dtype=np.float32 if args.float32 else np.float64,
+        port=args.port,
+    )
+    print(f"watching {args.directory}, status on http://{service.host}:{service.port}/status")
+    try:
+        service.run()
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+def screen_command(args):
+    with Cache(args.out).index() as index:
+        rows = index.screen(args.symbol, args.statistic, args.comparison, args.threshold, args.location)
+    for path, location, value in rows:
+        print(f"{path}  {location}  {value:g}")
+    print(f"{len(rows)} matches")
+    return 0
+
+
+def convert_file(
+    path, directory, max_bytes, dtype=np.float64, force=False, compression=None, verify=False, collect_metrics=False
+):
+    """
+    Convert one file into the cache; returns (source bytes, seconds, error,
+    metrics), the error being that of `verify_precision` if `verify` is set
+    and metrics the per-stage report if `collect_metrics` is.
+    """
+    if collect_metrics:
+        metrics.enable()
+        metrics.reset()
+    cache = Cache(directory, max_bytes, compression)
+    if force and cache.contains(path, dtype):
+        cache.path_for(path, dtype).unlink()
+    start = time.perf_counter()
+    hdf5_path = cache.get(path, dtype)
+    seconds = time.perf_counter() - start
+    error = verify_precision(path, hdf5_path) if verify else None
+    return os.path.getsize(path), seconds, error, metrics.report() if collect_metrics else None
+
+
+def _rate(size, seconds):
+    return f"{size / 2 ** 20 / seconds:.1f} MB/s" if seconds > 0 else "-"
+
+
+if __name__ == "__main__":
+    sys.exit(main())
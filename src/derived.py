@@ -0,0 +1,157 @@
+import os
+
+import numpy as np
+import h5py
+
+
+class Derived:
+    """
+    Derived quantities of a PPL, computed with whole-array operations over
+    all time steps at once from the per-branch (time, node) arrays and the
+    branch geometry.
+
+    Results are memoised per (quantity, branch, symbol, parameters) and, if
+    `store` names an HDF5 file, also written under /derived/<branch>/ and
+    read back from there by later sessions of the same source file. The
+    file must be a separate one: the store of a lazily opened or cached
+    PPL is open read-only while the PPL is.
+    """
+
+    def __init__(self, ppl, store=None):
+        hdf5 = getattr(ppl, "_hdf5", None)
+        if store is not None and hdf5 is not None and os.path.exists(store):
+            if os.path.samefile(store, hdf5.filename):
+                raise Exception(f"{store} is the PPL's own read-only store; give a separate file for derived results.")
+        self.ppl = ppl
+        self.store = store
+        self._results = {}
+
+    def variable(self, symbol, branch):
+        """(time, position) values of `symbol` in `branch`, and the positions."""
+        item = self.ppl._item(symbol, branch)
+        return np.asarray(item.data[...]), self.ppl.branch(branch).positions(item.kind)
+
+    def section_lengths(self, branch):
+        return np.diff(self.ppl.branch(branch).values[0])
+
+    def integral(self, symbol, branch, factor=1.0):
+        """
+        Integral of `symbol` along `branch` at every time step, e.g. holdup
+        times flow area gives the liquid inventory. SECTION values are
+        treated as constant over their section; BOUNDARY values are
+        integrated with the trapezoidal rule.
+        """
+
+        def compute():
+            values, _ = self.variable(symbol, branch)
+            dx = self.section_lengths(branch)
+            if values.shape[1] == len(dx):
+                return factor * (values @ dx)
+            return factor * (((values[:, 1:] + values[:, :-1]) / 2) @ dx)
+
+        return self._cached("integral", branch, symbol, (factor,), compute)
+
+    def liquid_inventory(self, branch, area, symbol="HOL"):
+        """Liquid volume in `branch` over time for a pipe of flow `area`."""
+        return self.integral(symbol, branch, area)
+
+    def difference(self, symbol, branch):
+        """Inlet minus outlet value over time, e.g. the pressure drop with PT."""
+
+        def compute():
+            values, _ = self.variable(symbol, branch)
+            return values[:, 0] - values[:, -1]
+
+        return self._cached("difference", branch, symbol, (), compute)
+
+    def pressure_drop(self, branch, symbol="PT"):
+        return self.difference(symbol, branch)
+
+    def gradient(self, symbol, branch):
+        """Spatial derivative d(symbol)/dx, shaped (time, position)."""
+
+        def compute():
+            values, positions = self.variable(symbol, branch)
+            if values.shape[1] < 2:
+                return np.zeros_like(values)
+            return np.gradient(values, positions, axis=1)
+
+        return self._cached("gradient", branch, symbol, (), compute)
+
+    def time_derivative(self, symbol, branch):
+        """Time derivative d(symbol)/dt, shaped (time, position)."""
+
+        def compute():
+            values, _ = self.variable(symbol, branch)
+            if values.shape[0] < 2:
+                return np.zeros_like(values)
+            return np.gradient(values, self.ppl.times, axis=0)
+
+        return self._cached("time_derivative", branch, symbol, (), compute)
+
+    def rolling(self, symbol, branch, window, statistic="mean"):
+        """
+        Rolling `statistic` (mean, min, max or std) of `symbol` over `window`
+        time steps, shaped (time - window + 1, position).
+        """
+
+        def compute():
+            values, _ = self.variable(symbol, branch)
+            windows = np.lib.stride_tricks.sliding_window_view(values, window, axis=0)
+            return getattr(np, statistic)(windows, axis=-1)
+
+        return self._cached("rolling", branch, symbol, (window, statistic), compute)
+
+    def extremes(self, symbol, branch):
+        """
+        Per position maximum and minimum of `symbol` over the run and the
+        times they occur, as a (4, position) array:
+        max, time of max, min, time of min.
+        """
+
+        def compute():
+            values, _ = self.variable(symbol, branch)
+            times = self.ppl.times
+            i_max = values.argmax(axis=0)
+            i_min = values.argmin(axis=0)
+            return np.stack([values.max(axis=0), times[i_max], values.min(axis=0), times[i_min]])
+
+        return self._cached("extremes", branch, symbol, (), compute)
+
+    def _cached(self, quantity, branch, symbol, parameters, compute):
+        key = "_".join([quantity, symbol] + [str(p) for p in parameters])
+        if (branch, key) in self._results:
+            return self._results[(branch, key)]
+        result = self._read_store(branch, key)
+        if result is None:
+            result = compute()
+            self._write_store(branch, key, result)
+        self._results[(branch, key)] = result
+        return result
+
+    def _read_store(self, branch, key):
+        if self.store is None or not os.path.exists(self.store):
+            return None
+        with h5py.File(self.store, "r") as hdf5:
+            name = f"derived/{branch}/{key}"
+            # derived results are only valid for the data they were made from
+            if name in hdf5 and hdf5[name].attrs.get("source") == self._source():
+                return hdf5[name][...]
+        return None
+
+    def _write_store(self, branch, key, result):
+        if self.store is None:
+            return
+        with h5py.File(self.store, "a") as hdf5:
+            name = f"derived/{branch}/{key}"
+            if name in hdf5:
+                del hdf5[name]
+            dataset = hdf5.create_dataset(name, data=result, compression="gzip")
+            dataset.attrs["source"] = self._source()
+
+    def _source(self):
+        # the source file as it was read, and the time steps read from it
+        stat = os.stat(self.ppl.path)
+        times = self.ppl.times
+        last = float(times[-1]) if len(times) else None
+        return f"{os.path.realpath(self.ppl.path)}:{stat.st_size}:{stat.st_mtime_ns}:{len(times)}:{last}"
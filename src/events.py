@@ -0,0 +1,234 @@
+import operator
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+
+from .stu_flo import PPL, Trend, TimeSeriesDecoder, catalog_widths, iter_records
+
+comparisons = {">": operator.gt, ">=": operator.ge, "<": operator.lt, "<=": operator.le}
+
+
+@dataclass
+class Rule:
+    """
+    `symbol` in `branch` (the location, for trend plots) compared with
+    `threshold`; an event is a run of time steps where the comparison holds
+    anywhere in the branch lasting at least `min_duration`.
+    """
+
+    symbol: str
+    branch: str
+    comparison: str
+    threshold: float
+    min_duration: float = 0.0
+
+    def __post_init__(self):
+        if self.comparison not in comparisons:
+            raise Exception(f"Unknown comparison {self.comparison}, expected one of {list(comparisons)}.")
+
+
+@dataclass
+class Event:
+
+    rule: Rule
+    start: float
+    end: float
+    x0: float
+    x1: float
+    peak: float
+    peak_time: float
+    peak_position: float
+
+    @property
+    def duration(self):
+        return self.end - self.start
+
+
+def scan(plot, rules, block_rows=4096):
+    """
+    Events of each of `rules` in a loaded or lazily opened PPL or TPL,
+    evaluated `block_rows` time steps at a time so a lazy store is read in
+    bounded blocks.
+    """
+    scanners = [EventScanner(rule, _positions(plot, rule)) for rule in rules]
+    for start in range(0, len(plot.times), block_rows):
+        rows = slice(start, start + block_rows)
+        for scanner in scanners:
+            data = plot._item(scanner.rule.symbol, scanner.rule.branch).data
+            scanner.feed(plot.times[rows], np.asarray(data[rows]))
+    return [event for scanner in scanners for event in scanner.close()]
+
+
+def scan_file(path, rules, block_rows=256):
+    """
+    Events of each of `rules` streamed from a .ppl or .tpl file: only the
+    catalog rows the rules use are decoded, `block_rows` time steps at a
+    time, so files too large to load can be screened.
+    """
+    wanted = {(r.symbol, r.branch) for r in rules}
+    selected = {}
+
+    def select(catalog):
+        rows = [n for n, c in enumerate(catalog) if (c.symbol, _location(c)) in wanted]
+        selected.update(rows=rows, catalog=[catalog[n] for n in rows])
+        return rows
+
+    branches = []
+    decoder = None
+    scanners = None
+    for record in iter_records(path, select=select):
+        kind = type(record).__name__
+        if kind == "Branch":
+            branches.append(record)
+        elif kind in ["TimeStep", "TrendRows"]:
+            if decoder is None:
+                catalog = selected["catalog"]
+                trend = isinstance(catalog[0], Trend) if catalog else kind == "TrendRows"
+                widths = [1] * len(catalog) if trend else catalog_widths(branches, catalog)
+                decoder = TimeSeriesDecoder(widths)
+                scanners = _file_scanners(rules, catalog, branches, decoder.offsets)
+            if kind == "TimeStep":
+                decoder.append(record)
+            else:
+                decoder.extend(record, selected["rows"])
+            if decoder.count >= block_rows:
+                _feed(scanners, decoder)
+    if decoder is None:
+        return []
+    _feed(scanners, decoder)
+    return [event for scanner, _ in scanners for event in scanner.close()]
+
+
+def to_frame(events):
+    """The events as a DataFrame, one row per event."""
+    return pd.DataFrame(
+        [
+            {
+                "symbol": e.rule.symbol,
+                "branch": e.rule.branch,
+                "comparison": e.rule.comparison,
+                "threshold": e.rule.threshold,
+                "start": e.start,
+                "end": e.end,
+                "duration": e.duration,
+                "x0": e.x0,
+                "x1": e.x1,
+                "peak": e.peak,
+                "peak_time": e.peak_time,
+                "peak_position": e.peak_position,
+            }
+            for e in events
+        ]
+    )
+
+
+class EventScanner:
+    """
+    Finds the events of one rule in consecutive blocks of (time, position)
+    values, carrying an event still open at the end of a block into the
+    next. The comparison, the any-position reduction and the run detection
+    are whole-block array operations; only the runs found are looped over.
+    """
+
+    def __init__(self, rule, positions=None):
+        self.rule = rule
+        self.positions = positions
+        self.compare = comparisons[rule.comparison]
+        self.sign = 1.0 if rule.comparison in [">", ">="] else -1.0
+        self.events = []
+        self._open = None
+
+    def feed(self, times, values):
+        if len(times) == 0:
+            return
+        values = values.reshape(len(times), -1)
+        hit = self.compare(values, self.rule.threshold)
+        active = hit.any(axis=1)
+        edges = np.diff(np.concatenate([[0], active.astype(np.int8), [0]]))
+        starts = np.flatnonzero(edges == 1)
+        ends = np.flatnonzero(edges == -1)
+        # the most extreme value of each row, counting only positions that hit
+        signed = np.where(hit, self.sign * values, -np.inf)
+        row_peak = signed.max(axis=1)
+        row_where = signed.argmax(axis=1)
+        if self._open is not None and (len(starts) == 0 or starts[0] > 0):
+            self._finish()
+        for s, e in zip(starts, ends):
+            k = s + int(np.argmax(row_peak[s:e]))
+            columns = np.flatnonzero(hit[s:e].any(axis=0))
+            run = {
+                "start": times[s],
+                "end": times[e - 1],
+                "c0": columns[0],
+                "c1": columns[-1],
+                "peak": row_peak[k],
+                "peak_time": times[k],
+                "peak_column": row_where[k],
+            }
+            if s == 0 and self._open is not None:
+                run = self._merge(self._open, run)
+            self._open = run
+            if e < len(times):
+                self._finish()
+
+    def close(self):
+        """Finish any open event; returns the events found."""
+        if self._open is not None:
+            self._finish()
+        return self.events
+
+    @staticmethod
+    def _merge(first, second):
+        merged = dict(first, end=second["end"], c0=min(first["c0"], second["c0"]), c1=max(first["c1"], second["c1"]))
+        if second["peak"] > first["peak"]:
+            merged.update(peak=second["peak"], peak_time=second["peak_time"], peak_column=second["peak_column"])
+        return merged
+
+    def _finish(self):
+        run, self._open = self._open, None
+        if run["end"] - run["start"] < self.rule.min_duration:
+            return
+        x = self.positions
+        self.events.append(
+            Event(
+                self.rule,
+                float(run["start"]),
+                float(run["end"]),
+                None if x is None else float(x[run["c0"]]),
+                None if x is None else float(x[run["c1"]]),
+                float(self.sign * run["peak"]),
+                float(run["peak_time"]),
+                None if x is None else float(x[run["peak_column"]]),
+            )
+        )
+
+
+def _location(item):
+    return item.location if isinstance(item, Trend) else item.branch
+
+
+def _positions(plot, rule):
+    if not isinstance(plot, PPL):
+        return None
+    return plot.branch(rule.branch).positions(plot._item(rule.symbol, rule.branch).kind)
+
+
+def _file_scanners(rules, catalog, branches, offsets):
+    index = {(c.symbol, _location(c)): n for n, c in enumerate(catalog)}
+    by_name = {b.name: b for b in branches}
+    scanners = []
+    for rule in rules:
+        n = index.get((rule.symbol, rule.branch))
+        if n is None:
+            raise KeyError(f"No variable {rule.symbol} at '{rule.branch}'.")
+        item = catalog[n]
+        positions = None if isinstance(item, Trend) else by_name[item.branch].positions(item.kind)
+        scanners.append((EventScanner(rule, positions), slice(int(offsets[n]), int(offsets[n + 1]))))
+    return scanners
+
+
+def _feed(scanners, decoder):
+    for scanner, columns in scanners:
+        scanner.feed(decoder.times, decoder.values[:, columns])
+    decoder.clear()
@@ -0,0 +1,103 @@
+import contextlib
+import json
+import logging
+import os
+import sys
+import time
+
+try:
+    import resource
+except ImportError:  # not on Windows
+    resource = None
+
+logger = logging.getLogger("stu_flow")
+
+_disabled = contextlib.nullcontext()
+
+
+class Metrics:
+    """
+    Per-stage wall time, bytes processed, arrays allocated and peak memory of
+    the parse and conversion pipeline.
+
+    Off unless `enable()` is called or $STU_FLOW_METRICS is set; when off,
+    `stage()` returns a shared no-op context manager and `allocated()`
+    returns at once, so the instrumentation costs one attribute check.
+    """
+
+    def __init__(self):
+        self.enabled = bool(os.environ.get("STU_FLOW_METRICS"))
+        self.reset()
+
+    def enable(self, enabled=True):
+        self.enabled = enabled
+
+    def reset(self):
+        self.stages = {}
+
+    def stage(self, name, nbytes=0):
+        """Context manager timing one call of stage `name` over `nbytes` of input."""
+        if not self.enabled:
+            return _disabled
+        return self._time(name, nbytes)
+
+    @contextlib.contextmanager
+    def _time(self, name, nbytes):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            stage = self._stage(name)
+            stage["calls"] += 1
+            stage["seconds"] += time.perf_counter() - start
+            stage["bytes"] += nbytes
+            stage["peak_rss_mb"] = max(stage["peak_rss_mb"], peak_rss_mb())
+
+    def allocated(self, name, *arrays):
+        """Record new `arrays` allocated during stage `name`."""
+        if not self.enabled:
+            return
+        stage = self._stage(name)
+        stage["arrays"] += len(arrays)
+        stage["allocated_bytes"] += sum(a.nbytes for a in arrays)
+
+    def _stage(self, name):
+        if name not in self.stages:
+            self.stages[name] = {
+                "calls": 0,
+                "seconds": 0.0,
+                "bytes": 0,
+                "arrays": 0,
+                "allocated_bytes": 0,
+                "peak_rss_mb": 0.0,
+            }
+        return self.stages[name]
+
+    def report(self):
+        return {"stages": self.stages, "peak_rss_mb": peak_rss_mb()}
+
+    def dump(self, path):
+        with open(path, "w") as f:
+            json.dump(self.report(), f, indent=2)
+
+    def log(self, level=logging.INFO):
+        for name, stage in self.stages.items():
+            rate = stage["bytes"] / 2 ** 20 / stage["seconds"] if stage["seconds"] else 0.0
+            logger.log(
+                level,
+                f"{name}: {stage['calls']} calls, {stage['seconds']:.3f} s, "
+                f"{stage['bytes'] / 2 ** 20:.1f} MB ({rate:.1f} MB/s), "
+                f"{stage['arrays']} arrays ({stage['allocated_bytes'] / 2 ** 20:.1f} MB), "
+                f"peak RSS {stage['peak_rss_mb']:.1f} MB",
+            )
+
+
+def peak_rss_mb():
+    if resource is None:
+        return 0.0
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # kilobytes on Linux, bytes on macOS
+    return rss / 2 ** 20 if sys.platform == "darwin" else rss / 2 ** 10
+
+
+metrics = Metrics()
@@ -0,0 +1,161 @@
+import os
+from pathlib import Path
+
+import numpy as np
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from .stu_flo import Trend, TimeSeriesDecoder, branch_targets, catalog_widths, iter_records
+
+
+def export_parquet(path, directory, case=None, dtype=np.float64, buffer_rows=256):
+    """
+    Stream a .ppl or .tpl file into the hive-partitioned Parquet datasets
+    under `directory`, one row group per `buffer_rows` time steps, so a case
+    is never held in memory. `case` defaults to the file name without suffix.
+    Returns the paths of the files written. Files are written under hidden
+    temporary names and renamed into place once the whole case is written,
+    so a failed export leaves no partial files in the datasets.
+    """
+    if case is None:
+        case = Path(path).stem
+    writer = ParquetWriter(directory, case, dtype, buffer_rows)
+    writer.write(iter_records(path))
+    return writer.paths
+
+
+class ParquetWriter:
+    """
+    Streams OLGA plot records into Parquet files.
+
+    Layout::
+
+        profiles/case=<case>/branch=<name>/kind=boundary/data.parquet
+        profiles/case=<case>/branch=<name>/kind=section/data.parquet
+        trends/case=<case>/data.parquet
+
+    Profile files have a row per (time, position) with `time`, `position`
+    and one column per variable; the trend file has a row per time with one
+    column per `symbol:location` (just `symbol` for GLOBAL trends). The OLGA
+    header fields are stored in each file's schema metadata and the units
+    and description of each variable in its field metadata.
+    """
+
+    def __init__(self, directory, case, dtype=np.float64, buffer_rows=256):
+        self.directory = Path(directory)
+        self.case = case
+        self.dtype = np.dtype(dtype)
+        self.buffer_rows = buffer_rows
+        self.header = {}
+        self.branches = []
+        self.catalog = []
+        self.paths = []
+        self._decoder = None
+        self._pending = None
+        self._targets = []
+
+    def write(self, records):
+        try:
+            for record in records:
+                getattr(self, f"process_{type(record).__name__.lower()}")(record)
+            self.flush()
+        except BaseException:
+            for writer, _, _, _ in self._targets:
+                writer.close()
+                os.remove(writer.where)
+            raise
+        for writer, _, _, path in self._targets:
+            writer.close()
+            os.replace(writer.where, path)
+
+    def process_header(self, header):
+        self.header[header.keyword] = str(header.value)
+
+    def process_branch(self, branch):
+        self.branches.append(branch)
+
+    def process_catalog(self, catalog):
+        self.catalog.append(catalog)
+
+    def process_trend(self, trend):
+        self.catalog.append(trend)
+
+    def process_timestep(self, time_step):
+        if self._decoder is None:
+            self._start_time_series(catalog_widths(self.branches, self.catalog))
+        self._decoder.append(time_step)
+        if self._decoder.count == self.buffer_rows:
+            self.flush(final=False)
+
+    def process_trendrows(self, trend_rows):
+        if self._decoder is None:
+            self._start_time_series([1] * len(self.catalog))
+        self._decoder.extend(trend_rows)
+        if self._decoder.count >= self.buffer_rows:
+            self.flush(final=False)
+
+    def _start_time_series(self, widths):
+        self._decoder = TimeSeriesDecoder(widths, dtype=self.dtype)
+        if isinstance(self.catalog[0], Trend):
+            names = [c.symbol if c.kind == "GLOBAL" else f"{c.symbol}:{c.location}" for c in self.catalog]
+            schema = self._schema(names, self.catalog, {}, position=False)
+            self._open(self.directory / "trends" / f"case={self.case}" / "data.parquet", schema, None, None)
+            return
+        offsets = self._decoder.offsets[:-1]
+        for branch, kind, items, idx in branch_targets(self.branches, self.catalog, offsets):
+            catalog = [self.catalog[n] for n in items]
+            partition = {"branch": branch.name, "kind": kind.lower()}
+            schema = self._schema([c.symbol for c in catalog], catalog, partition, position=True)
+            path = (
+                self.directory / "profiles" / f"case={self.case}"
+                / f"branch={branch.name}" / f"kind={kind.lower()}" / "data.parquet"
+            )
+            self._open(path, schema, idx, branch.positions(kind))
+
+    def _schema(self, names, catalog, partition, position):
+        fields = [pa.field("time", pa.float64())]
+        if position:
+            fields.append(pa.field("position", pa.float64()))
+        value_type = pa.from_numpy_dtype(self.dtype)
+        for name, c in zip(names, catalog):
+            fields.append(
+                pa.field(name, value_type, metadata={"units": c.units, "description": c.description})
+            )
+        metadata = {**self.header, "case": self.case, **partition}
+        return pa.schema(fields, metadata=metadata)
+
+    def _open(self, path, schema, idx, positions):
+        path.parent.mkdir(parents=True, exist_ok=True)
+        # a leading dot keeps dataset readers away from it until renamed
+        writer = pq.ParquetWriter(path.with_name(f".{path.name}.tmp"), schema)
+        self._targets.append((writer, idx, positions, path))
+        self.paths.append(path)
+
+    def flush(self, final=True):
+        """
+        Write the decoded time steps as row groups of `buffer_rows`; unless
+        `final`, a remainder short of a whole row group is kept for the next.
+        """
+        if self._decoder is None:
+            return
+        times = self._decoder.times
+        values = self._decoder.values
+        if self._pending is not None:
+            times = np.concatenate([self._pending[0], times])
+            values = np.concatenate([self._pending[1], values])
+        stop = len(times) if final else len(times) - len(times) % self.buffer_rows
+        for start in range(0, stop, self.buffer_rows):
+            rows = slice(start, min(start + self.buffer_rows, stop))
+            self._write_rows(times[rows], values[rows])
+        self._pending = (times[stop:].copy(), values[stop:].copy()) if stop < len(times) else None
+        self._decoder.clear()
+
+    def _write_rows(self, times, values):
+        for writer, idx, positions, _ in self._targets:
+            if idx is None:
+                columns = [times] + list(values.T)
+            else:
+                block = values[:, idx].reshape(-1, idx.shape[1])
+                columns = [np.repeat(times, len(positions)), np.tile(positions, len(times))]
+                columns += list(block.T)
+            writer.write_table(pa.Table.from_arrays(columns, schema=writer.schema))
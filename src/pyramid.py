@@ -0,0 +1,162 @@
+import numpy as np
+
+statistics = ["min", "max", "mean"]
+
+
+def time_series_datasets(hdf5):
+    """Names of the (time, ...) datasets of a store written by HDF5Writer."""
+    names = []
+    if "trends" in hdf5:
+        names.append("trends")
+    for branch, group in hdf5.get("branches", {}).items():
+        for kind in ["boundary", "section"]:
+            if kind in group:
+                names.append(f"branches/{branch}/{kind}")
+    return names
+
+
+def build_pyramid(hdf5, factor=4, min_rows=256, min_nodes=32, block_rows=4096, filters=None):
+    """
+    Precompute min/max/mean decimation levels of every time series dataset.
+
+    Level k (under /pyramid/<dataset>/<k>) summarises blocks of factor**k
+    time steps and, for profiles, blocks of up to factor**k nodes (keeping at
+    least `min_nodes` positions). Levels are added until one has no more
+    than `min_rows` rows. Each level is computed from the one below in
+    blocks of rows, so the full series is never held in memory. Levels are
+    stored in the dtype of their dataset, compressed with the h5py
+    `filters` (gzip by default). Any existing pyramid is replaced.
+    """
+    if filters is None:
+        filters = {"compression": "gzip", "shuffle": True}
+    if "pyramid" in hdf5:
+        del hdf5["pyramid"]
+    times = hdf5["time"]
+    hdf5.require_group("pyramid").attrs["rows"] = len(times)
+    for name in time_series_datasets(hdf5):
+        dataset = hdf5[name]
+        profile = dataset.ndim == 3
+        source = _RawLevel(dataset, times)
+        level = 0
+        while source.rows > min_rows:
+            level += 1
+            node_factor = 1
+            if profile and source.nodes // factor >= min_nodes:
+                node_factor = factor
+            group = hdf5.create_group(f"pyramid/{name}/{level}")
+            group.attrs["time_block"] = factor ** level
+            group.attrs["node_block"] = source.node_block * node_factor
+            source = _reduce(source, group, factor, node_factor, block_rows, dataset.dtype, filters)
+
+
+def overview(hdf5, name, points, t0=None, t1=None, column=None):
+    """
+    The coarsest level of dataset `name` with at least `points` rows between
+    t0 and t1, as a dict of `time` (row start and end times), `min`, `max`,
+    `mean` and the `node_block` positions summarised per value. Only the
+    variable `column` is read if given. Falls back to the raw data
+    (min = max = mean) if no level is fine enough, or if time steps have
+    been appended since the pyramid was built.
+    """
+    key = lambda rows: (rows,) if column is None else (rows, Ellipsis, column)
+    levels = []
+    if is_current(hdf5):
+        levels = sorted((int(k) for k in hdf5.get(f"pyramid/{name}", {})), reverse=True)
+    for level in levels:
+        group = hdf5[f"pyramid/{name}/{level}"]
+        rows = _window(group["time"][:, 0], group["time"][:, 1], t0, t1)
+        if rows.stop - rows.start >= points:
+            result = {s: group[s][key(rows)] for s in statistics}
+            result["time"] = group["time"][rows]
+            result["node_block"] = int(group.attrs["node_block"])
+            return result
+    times = hdf5["time"][...]
+    rows = _window(times, times, t0, t1)
+    values = hdf5[name][key(rows)]
+    result = {s: values for s in statistics}
+    result["time"] = np.stack([times[rows], times[rows]], axis=1)
+    result["node_block"] = 1
+    return result
+
+
+def is_current(hdf5):
+    """True if the store's pyramid covers all of its time steps."""
+    return "pyramid" in hdf5 and hdf5["pyramid"].attrs.get("rows") == len(hdf5["time"])
+
+
+def _window(start, end, t0, t1):
+    i0 = 0 if t0 is None else int(np.searchsorted(end, t0, side="left"))
+    i1 = len(start) if t1 is None else int(np.searchsorted(start, t1, side="right"))
+    return slice(i0, i1)
+
+
+class _RawLevel:
+    node_block = 1
+
+    def __init__(self, dataset, times):
+        self.dataset = dataset
+        self.times = times
+        self.rows = dataset.shape[0]
+        self.nodes = dataset.shape[1] if dataset.ndim == 3 else 1
+
+    def read(self, rows):
+        values = self.dataset[rows]
+        times = self.times[rows]
+        counts = np.ones(len(times))
+        node_counts = np.ones(self.nodes)
+        return values, values, values, np.stack([times, times], axis=1), counts, node_counts
+
+
+class _Level:
+    def __init__(self, group, node_block):
+        self.group = group
+        self.rows = group["time"].shape[0]
+        self.nodes = group["mean"].shape[1] if group["mean"].ndim == 3 else 1
+        self.node_block = node_block
+
+    def read(self, rows):
+        g = self.group
+        return g["min"][rows], g["max"][rows], g["mean"][rows], g["time"][rows], g["count"][rows], g["node_count"][...]
+
+
+def _reduce(source, group, factor, node_factor, block_rows, dtype, filters):
+    block_rows -= block_rows % factor
+    for start in range(0, source.rows, block_rows):
+        rows = slice(start, min(start + block_rows, source.rows))
+        mn, mx, mean, times, counts, node_counts = source.read(rows)
+        starts = np.arange(0, len(times), factor)
+        weights = mean * counts.reshape((-1,) + (1,) * (mean.ndim - 1))
+        mn = np.minimum.reduceat(mn, starts, axis=0)
+        mx = np.maximum.reduceat(mx, starts, axis=0)
+        total = np.add.reduceat(weights, starts, axis=0)
+        new_counts = np.add.reduceat(counts, starts)
+        new_node_counts = node_counts
+        if node_factor > 1:
+            node_starts = np.arange(0, mean.shape[1], node_factor)
+            mn = np.minimum.reduceat(mn, node_starts, axis=1)
+            mx = np.maximum.reduceat(mx, node_starts, axis=1)
+            total = np.add.reduceat(total * node_counts[:, np.newaxis], node_starts, axis=1)
+            new_node_counts = np.add.reduceat(node_counts, node_starts)
+            total /= new_node_counts[:, np.newaxis]
+        mean = total / new_counts.reshape((-1,) + (1,) * (total.ndim - 1))
+        times = np.stack([times[starts, 0], np.maximum.reduceat(times[:, 1], starts)], axis=1)
+        _append(group, "min", mn.astype(dtype, copy=False), filters)
+        _append(group, "max", mx.astype(dtype, copy=False), filters)
+        _append(group, "mean", mean.astype(dtype, copy=False), filters)
+        _append(group, "time", times, filters)
+        _append(group, "count", new_counts, filters)
+    if "node_count" not in group:
+        group.create_dataset("node_count", data=new_node_counts)
+    return _Level(group, group.attrs["node_block"])
+
+
+def _append(group, name, block, filters):
+    if name not in group:
+        group.create_dataset(
+            name, data=block, maxshape=(None,) + block.shape[1:], chunks=True, **filters
+        )
+        return
+    dataset = group[name]
+    start = dataset.shape[0]
+    dataset.resize(start + len(block), axis=0)
+    dataset[start:] = block
@@ -0,0 +1,174 @@
+import asyncio
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from pathlib import Path
+
+import numpy as np
+
+from .cli import convert_file
+from .stu_flo import Cache
+
+
+class IngestService:
+    """
+    Converts .ppl/.tpl files dropped into `directory` into the cache.
+
+    The directory is polled every `interval` seconds; a new or changed file
+    is queued once its size and mtime are unchanged between two polls, so
+    files still being copied in are left alone. Up to `jobs` conversions run
+    at once in a process pool and at most `queue_size` more wait in the
+    queue; beyond that the watcher waits, so a large drop never builds up
+    unbounded work. A conversion that kills its worker process fails alone:
+    the pool is replaced and the jobs it took down are rerun. Job states and
+    throughput are served as JSON on http://<host>:<port>/status.
+    """
+
+    suffixes = [".ppl", ".tpl"]
+
+    def __init__(
+        self,
+        directory,
+        cache=None,
+        jobs=None,
+        queue_size=64,
+        interval=2.0,
+        dtype=np.float64,
+        host="127.0.0.1",
+        port=8765,
+    ):
+        self.directory = Path(directory)
+        self.cache = cache if isinstance(cache, Cache) else Cache(cache)
+        self.jobs = jobs or os.cpu_count()
+        self.queue_size = queue_size
+        self.interval = interval
+        self.dtype = dtype
+        self.host = host
+        self.port = port
+        self.jobs_by_path = {}
+        self._seen = {}
+        self._started = None
+        self._bytes = 0
+        self._pool = None
+
+    def run(self):
+        asyncio.run(self.serve())
+
+    async def serve(self):
+        self._started = time.time()
+        self.queue = asyncio.Queue(self.queue_size)
+        server = await asyncio.start_server(self._handle, self.host, self.port)
+        self._pool = ProcessPoolExecutor(max_workers=self.jobs)
+        workers = [asyncio.create_task(self._work()) for _ in range(self.jobs)]
+        try:
+            async with server:
+                await self._watch()
+        finally:
+            for worker in workers:
+                worker.cancel()
+            await asyncio.gather(*workers, return_exceptions=True)
+            self._pool.shutdown()
+
+    async def _watch(self):
+        while True:
+            for path, state in self._scan():
+                if self._seen.get(path) != state:
+                    # changed since the last poll: wait for it to settle
+                    self._seen[path] = state
+                    continue
+                job = self.jobs_by_path.get(path)
+                if job is None or (job["state"] in ["done", "failed"] and job["source"] != state):
+                    self.jobs_by_path[path] = {"state": "queued", "source": state, "queued": time.time()}
+                    await self.queue.put(path)
+            await asyncio.sleep(self.interval)
+
+    def _scan(self):
+        for path in sorted(self.directory.iterdir()):
+            if path.suffix.lower() not in self.suffixes:
+                continue
+            try:
+                stat = path.stat()
+            except FileNotFoundError:
+                continue
+            yield str(path), (stat.st_size, stat.st_mtime_ns)
+
+    async def _convert(self, pool, path):
+        return await asyncio.get_running_loop().run_in_executor(
+            pool,
+            convert_file,
+            path,
+            self.cache.directory,
+            self.cache.max_bytes,
+            self.dtype,
+            False,
+            self.cache.compression,
+        )
+
+    async def _convert_alone(self, path):
+        # in a pool of its own, so a worker that dies takes only this job down
+        pool = ProcessPoolExecutor(max_workers=1)
+        try:
+            return await self._convert(pool, path)
+        finally:
+            pool.shutdown(wait=False)
+
+    async def _work(self):
+        while True:
+            path = await self.queue.get()
+            job = self.jobs_by_path[path]
+            job.update(state="running", started=time.time())
+            try:
+                pool = self._pool
+                try:
+                    size, seconds, _, _ = await self._convert(pool, path)
+                except BrokenProcessPool:
+                    # some worker died and failed every job in the pool, this
+                    # one included: replace the pool (once, whichever worker
+                    # gets here first) and rerun the job on its own
+                    if self._pool is pool:
+                        self._pool = ProcessPoolExecutor(max_workers=self.jobs)
+                        pool.shutdown(wait=False)
+                    size, seconds, _, _ = await self._convert_alone(path)
+            except Exception as e:
+                job.update(state="failed", error=f"{type(e).__name__}: {e}")
+            else:
+                self._bytes += size
+                job.update(state="done", bytes=size, seconds=seconds)
+            finally:
+                job["finished"] = time.time()
+                self.queue.task_done()
+
+    def status(self):
+        states = [job["state"] for job in self.jobs_by_path.values()]
+        elapsed = time.time() - self._started if self._started else 0.0
+        return {
+            "counts": {s: states.count(s) for s in ["queued", "running", "done", "failed"]},
+            "converted_mb": self._bytes / 2 ** 20,
+            "throughput_mb_s": self._bytes / 2 ** 20 / elapsed if elapsed else 0.0,
+            "jobs": {
+                path: {k: v for k, v in job.items() if k != "source"}
+                for path, job in self.jobs_by_path.items()
+            },
+        }
+
+    async def _handle(self, reader, writer):
+        # a minimal HTTP/1.0 responder: GET /status only
+        try:
+            request = await reader.readline()
+            while (await reader.readline()).strip():
+                pass
+            parts = request.decode("latin-1").split()
+            if len(parts) >= 2 and parts[0] == "GET" and parts[1] == "/status":
+                code, body = "200 OK", json.dumps(self.status(), indent=2)
+            else:
+                code, body = "404 Not Found", json.dumps({"error": "not found"})
+            data = body.encode()
+            writer.write(
+                f"HTTP/1.0 {code}\r\nContent-Type: application/json\r\n"
+                f"Content-Length: {len(data)}\r\n\r\n".encode() + data
+            )
+            await writer.drain()
+        finally:
+            writer.close()
@@ -0,0 +1,128 @@
+import json
+import os
+import shutil
+import tempfile
+from pathlib import Path
+
+import numpy as np
+
+from .stu_flo import PPL, TPL, Branch, Catalog, Header, Trend
+
+header_fields = [
+    "olga_version",
+    "plot",
+    "input_file",
+    "pvt_file",
+    "restart_file",
+    "date",
+    "project",
+    "title",
+    "author",
+    "network",
+    "geometry",
+]
+
+
+def shared_directory():
+    """
+    Where published cases live: $STU_FLOW_SHARED_DIR, or stu_flow/ in the
+    /dev/shm tmpfs (the temp directory where there is none), so published
+    arrays are shared memory pages rather than disk files.
+    """
+    base = Path("/dev/shm") if Path("/dev/shm").is_dir() else Path(tempfile.gettempdir())
+    return Path(os.environ.get("STU_FLOW_SHARED_DIR", base / "stu_flow"))
+
+
+def publish(plot, name, directory=None):
+    """
+    Copy the time axis and arrays of a loaded PPL or TPL into shared memory
+    as case `name`, replacing any earlier publication. Processes that have
+    already attached keep their mapping of the old copy.
+    """
+    directory = Path(directory or shared_directory())
+    directory.mkdir(parents=True, exist_ok=True)
+    tmp = Path(tempfile.mkdtemp(prefix=f".{name}-", dir=directory))
+    meta = {
+        "class": type(plot).__name__,
+        "path": str(plot.path),
+        "header": {
+            f: plot.date.isoformat() if f == "date" and plot.date is not None else getattr(plot, f)
+            for f in header_fields
+            if getattr(plot, f) is not None
+        },
+        "branches": [{"name": b.name, "count": b.count} for b in plot.branches],
+        "catalog": [
+            [getattr(c, f) for f in c.__dataclass_fields__ if f != "data"] for c in plot.catalog
+        ],
+    }
+    np.save(tmp / "time.npy", np.asarray(plot.times))
+    for n, branch in enumerate(plot.branches):
+        np.save(tmp / f"branch{n}_geometry.npy", np.stack(branch.values, axis=1))
+        if isinstance(plot, PPL):
+            for kind in ["boundary", "section"]:
+                if getattr(branch, kind) is not None:
+                    np.save(tmp / f"branch{n}_{kind}.npy", np.asarray(getattr(branch, kind)[...]))
+            meta["branches"][n]["symbols"] = {
+                kind: getattr(branch, f"{kind}_symbols") for kind in ["boundary", "section"]
+            }
+    if isinstance(plot, TPL):
+        # a lazily opened TPL has no values array, only its store
+        values = plot.values if plot.values is not None else plot._hdf5["trends"][...]
+        np.save(tmp / "values.npy", np.asarray(values))
+    with open(tmp / "meta.json", "w") as f:
+        json.dump(meta, f)
+    unpublish(name, directory)
+    os.rename(tmp, directory / name)
+    return directory / name
+
+
+def attach(name, directory=None):
+    """
+    The PPL or TPL published as `name`, its arrays read-only views of the
+    shared copy (so N processes attaching hold one copy between them).
+    """
+    path = Path(directory or shared_directory()) / name
+    if not path.exists():
+        raise Exception(f"No case {name} published in {path.parent}.")
+    with open(path / "meta.json") as f:
+        meta = json.load(f)
+    load = lambda file: np.load(path / file, mmap_mode="r")
+    plot = {"PPL": PPL, "TPL": TPL}[meta["class"]](meta["path"])
+    for k, v in meta["header"].items():
+        plot.process_header(Header(k, v))
+    item = Catalog if meta["class"] == "PPL" else Trend
+    plot.catalog = [item(*fields) for fields in meta["catalog"]]
+    plot.times = load("time.npy")
+    plot.dtype = plot.times.dtype
+    for n, b in enumerate(meta["branches"]):
+        geometry = load(f"branch{n}_geometry.npy")
+        branch = Branch(b["name"], b["count"], [geometry[:, 0], geometry[:, 1]])
+        for kind, symbols in b.get("symbols", {}).items():
+            if (path / f"branch{n}_{kind}.npy").exists():
+                setattr(branch, kind, load(f"branch{n}_{kind}.npy"))
+                plot.dtype = getattr(branch, kind).dtype
+            setattr(branch, f"{kind}_symbols", symbols)
+        plot.branches.append(branch)
+    if isinstance(plot, PPL):
+        plot.link_catalog()
+    else:
+        plot.values = load("values.npy")
+        plot.dtype = plot.values.dtype
+        for n, c in enumerate(plot.catalog):
+            c.data = plot.values[:, n]
+        plot.build_columns()
+    return plot
+
+
+def unpublish(name, directory=None):
+    """Remove case `name`; processes attached to it keep their mapping."""
+    path = Path(directory or shared_directory()) / name
+    if path.exists():
+        shutil.rmtree(path)
+
+
+def published(directory=None):
+    directory = Path(directory or shared_directory())
+    if not directory.exists():
+        return []
+    return sorted(p.name for p in directory.iterdir() if not p.name.startswith("."))
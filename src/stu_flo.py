@@ -1,235 +1,1773 @@
 import re
-import sys
 from dateutil import parser as parser
 from dataclasses import dataclass, field
 from typing import List
-import itertools
-import datetime
+import os
+import time
+import json
+import mmap
+import hashlib
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+from pathlib import Path
 
 import numpy as np
 import pandas as pd
 import h5py
 
-re_num = r"[\+|-]?\d*\.*\d+(?:[e|E][\+|-]?\d+)?"
-
-regex = {
-    "olga_version": re.compile(r"\'OLGA ([\d+.]*\d)\'"),
-    "input_file": re.compile(r"INPUT FILE\n\'(.*)\'"),
-    "restart_file": re.compile(r"RESTART FILE\n\'(.*)\'"),
-    "date": re.compile(r"DATE\n\'(.*)\'"),
-    "project": re.compile(r"PROJECT\n\'(.*)\'"),
-    "title": re.compile(r"TITLE\n\'(.*)\'"),
-    "author": re.compile(r"AUTHOR\n\'(.*)\'"),
-    "network": re.compile(r"NETWORK\n(\d*)"),
-    "branch": re.compile(
-        f"BRANCH\n\'(.*)\'\n(\d*)((?:\s*{re_num})*)"
-    ),
-    "catalog": re.compile(
-        r"CATALOG\s*(\d*)((?:\n.+\s*\'(?:BOUNDARY|SECTION):\'\s*\'BRANCH:\'\s*\'.*\'\s*\'\(.*\)\'\s*\'.*\')*)"
-    ),
-    "time_series": re.compile(
-        r"TIME SERIES\s*\'\s*\(.*\)\s*\'(?:\s*-?\d+\.\d+e(?:\+|-)\d+)*"
-    ),
+try:
+    import hdf5plugin  # registers the zstd and blosc HDF5 filters
+except ImportError:
+    hdf5plugin = None
+
+from .case_index import CaseIndex, index_path_in
+from .metrics import metrics
+from .pyramid import build_pyramid, overview
+
+# header keywords whose value is the quoted string on the following line
+string_keywords = {
+    "INPUT FILE": "input_file",
+    "PVT FILE": "pvt_file",
+    "RESTART FILE": "restart_file",
+    "DATE": "date",
+    "PROJECT": "project",
+    "TITLE": "title",
+    "AUTHOR": "author",
 }
 
-def store_ppl_in_hdf5(ppl_path):
-    ppl_data = _parse_ppl(ppl_path)
-    _build_hdf5('test', ppl_data)
-    return 'test'
+plot_kinds = ["PROFILE PLOT", "TIME PLOT"]
+
+catalog_item_re = re.compile(r"\'[^\']*\'|\S+")
+
+compressions = ["gzip", "lzf", "zstd", "blosc", "none"]
+
+
+def compression_filters(compression="gzip"):
+    """
+    h5py dataset filter keywords for one of `compressions`. All are lossless
+    and byte-shuffled; zstd and blosc need the optional hdf5plugin package,
+    both to write and to read a store.
+    """
+    if compression not in compressions:
+        raise Exception(f"Unknown compression {compression}, expected one of {compressions}.")
+    if compression == "none":
+        return {}
+    if compression in ["gzip", "lzf"]:
+        return {"compression": compression, "shuffle": True}
+    if hdf5plugin is None:
+        raise Exception(f"{compression} compression needs the hdf5plugin package.")
+    if compression == "zstd":
+        return {**hdf5plugin.Zstd(clevel=5), "shuffle": True}
+    # blosc shuffles internally
+    return dict(hdf5plugin.Blosc(cname="zstd", clevel=5, shuffle=hdf5plugin.Blosc.SHUFFLE))
+
+
+def store_ppl_in_hdf5(
+    ppl_path, hdf5_path=None, dtype=np.float64, append=False, follow=False, pyramid=True, compression="gzip"
+):
+    """
+    Convert a .ppl or .tpl file to the chunked HDF5 store layout.
+
+    Written next to the source file (with .h5 appended to its name, so a
+    .ppl and .tpl of the same case do not collide) unless `hdf5_path` is
+    given. With `append=True` an existing store is extended with the time
+    steps later than the last one it holds, reading the source only from
+    the byte offset where the previous conversion stopped. With
+    `follow=True` (or when appending) a partial time step at the end of a
+    file still being written is left for the next append. With
+    `pyramid=True` the min/max/mean decimation levels used by `overview`
+    are (re)built once the time steps are written. `dtype=np.float32`
+    halves the store without losing any of the 6 significant digits OLGA
+    prints (see `verify_precision`); `compression` is one of `compressions`.
+    """
+    if hdf5_path is None:
+        hdf5_path = hdf5_path_for(ppl_path)
+    with metrics.stage("convert", os.path.getsize(ppl_path)):
+        with h5py.File(hdf5_path, "a" if append else "w") as hdf5:
+            offset = hdf5.attrs.get("source_offset") if append else None
+            _build_hdf5(hdf5, iter_records(ppl_path, offset, follow or append), dtype, compression)
+            if pyramid:
+                with metrics.stage("pyramid"):
+                    build_pyramid(hdf5, filters=compression_filters(compression))
+    return hdf5_path
+
+
+class Cache:
+    """
+    Directory of converted HDF5 stores, so a plot file is parsed only once.
+
+    Entries are keyed by the resolved path, size and modification time of
+    the source file (and the storage dtype), so an edited or re-run case is
+    converted again and its old entry removed. Access refreshes an entry's
+    mtime and the least recently used entries are deleted once the directory
+    grows beyond `max_bytes`. New entries are written with `compression`
+    (default $STU_FLOW_COMPRESSION or gzip). With `indexed` every case is
+    also recorded in the CaseIndex at cases.sqlite in the directory (or
+    $STU_FLOW_INDEX), which outlives evicted entries.
+    """
+
+    def __init__(self, directory=None, max_bytes=None, compression=None, indexed=True):
+        if directory is None:
+            directory = os.environ.get(
+                "STU_FLOW_CACHE_DIR", Path.home() / ".cache" / "stu_flow"
+            )
+        if max_bytes is None:
+            max_bytes = int(os.environ.get("STU_FLOW_CACHE_BYTES", 10 * 2 ** 30))
+        if compression is None:
+            compression = os.environ.get("STU_FLOW_COMPRESSION", "gzip")
+        self.directory = Path(directory)
+        self.max_bytes = max_bytes
+        self.compression = compression
+        self.indexed = indexed
+
+    def path_for(self, path, dtype=np.float64):
+        path = Path(path).resolve()
+        stat = path.stat()
+        source = hashlib.sha1(str(path).encode()).hexdigest()[:16]
+        state = hashlib.sha1(f"{stat.st_size}:{stat.st_mtime_ns}".encode()).hexdigest()[:16]
+        # the dtype is outside the hashed state so get() only replaces stale
+        # entries of the same dtype
+        return self.directory / f"{path.name}-{source}-{np.dtype(dtype).name}-{state}.h5"
+
+    def contains(self, path, dtype=np.float64):
+        return self.path_for(path, dtype).exists()
+
+    def get(self, path, dtype=np.float64):
+        """Path of the up-to-date store for `path`, converting it on a miss."""
+        hdf5_path = self.path_for(path, dtype)
+        if hdf5_path.exists():
+            os.utime(hdf5_path)
+            self._index(path, hdf5_path)
+            return hdf5_path
+        self.directory.mkdir(parents=True, exist_ok=True)
+        prefix = hdf5_path.name.rsplit("-", 1)[0]
+        for stale in self.directory.glob(f"{prefix}-*.h5"):
+            stale.unlink()
+        fd, tmp = tempfile.mkstemp(suffix=".tmp", dir=self.directory)
+        os.close(fd)
+        try:
+            store_ppl_in_hdf5(path, tmp, dtype, compression=self.compression)
+            os.chmod(tmp, 0o644)
+            os.replace(tmp, hdf5_path)
+        finally:
+            if os.path.exists(tmp):
+                os.remove(tmp)
+        self.evict(keep=hdf5_path)
+        self._index(path, hdf5_path)
+        return hdf5_path
 
+    def index(self):
+        return CaseIndex(index_path_in(self.directory))
 
-def _parse_ppl(ppl_path):
+    def _index(self, path, hdf5_path):
+        if not self.indexed:
+            return
+        with self.index() as index:
+            if not index.contains(path):
+                index.add(path, hdf5_path)
 
-    with open(ppl_path, "r") as f:
-        data = f.read()
+    def evict(self, keep=None):
+        entries = []
+        for p in self.directory.glob("*.h5"):
+            try:
+                stat = p.stat()
+            except FileNotFoundError:
+                continue  # removed by another process sharing the cache
+            entries.append((stat.st_mtime, stat.st_size, p))
+        entries.sort()
+        total = sum(size for _, size, _ in entries)
+        for _, size, p in entries:
+            if total <= self.max_bytes:
+                break
+            if p != keep:
+                try:
+                    p.unlink()
+                except FileNotFoundError:
+                    pass
+                total -= size
 
-    matches = {
-        k: v
-        for k, v in {k: rx.findall(data) for k, rx in regex.items()}.items()
-        if len(v) > 0
-    }
-    
-    return matches
+    def clear(self):
+        for p in self.directory.glob("*.h5"):
+            p.unlink()
 
-def _build_hdf5(hdf5_file, data):
-    standard_strings = ["input_file", "restart_file", "project", "title", "author"]
-    this_module = sys.modules[__name__]
-    for k, v in data.items():
-        if k in standard_strings:
-            h5py.File(f"{hdf5_file}.h5", 'a')[k] = v[0]
+
+class PlotIndex:
+    """
+    Byte offsets into a plot file: the BRANCH and CATALOG blocks, and the
+    start of every TIME SERIES line, so a single time step or catalog row
+    can be read by seeking rather than scanning.
+
+    Saved as a small .npz sidecar next to the file. If the file has only
+    grown (OLGA still writing) the new lines are indexed incrementally; a
+    fingerprint of the header and the last indexed time step tells a grown
+    file from one rewritten at a larger size, which is indexed afresh.
+    """
+
+    version = 2
+    scan_bytes = 64 * 2 ** 20
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self.plot = None
+        self.step_lines = 1
+        self.blocks = []
+        self.time_series = None
+        self.header_end = None
+        self.lines = np.empty(0, dtype=np.int64)
+        self.times = np.empty(0, dtype=np.float64)
+        self.end = None
+        self.size = 0
+        self.mtime_ns = 0
+        self.fingerprint = None
+
+    def __len__(self):
+        return len(self.times)
+
+    def build(self):
+        self.plot = None
+        self.step_lines = 1
+        self.blocks = []
+        self.time_series = None
+        with open(self.path, "rb") as f:
+            lines = _Lines(f)
+            while True:
+                start = lines.offset
+                line = next(lines)
+                if line in plot_kinds:
+                    self.plot = line
+                elif line == "BRANCH":
+                    self.blocks.append(("BRANCH", _unquote(next(lines)), start))
+                elif line.startswith("CATALOG"):
+                    count = int(next(lines))
+                    self.blocks.append(("CATALOG", "", start))
+                    self.step_lines = 1 if self.plot == "TIME PLOT" else 1 + count
+                elif line.startswith("TIME SERIES"):
+                    self.time_series = start
+                    self.header_end = self.end = lines.offset
+                    break
+        self.lines = np.empty(0, dtype=np.int64)
+        self.times = np.empty(0, dtype=np.float64)
+        self._scan()
+        return self
+
+    def update(self):
+        """Bring the index up to date with the file; returns self."""
+        stat = self.path.stat()
+        if stat.st_size == self.size and stat.st_mtime_ns == self.mtime_ns:
+            return self
+        if stat.st_size > self.size and self.end is not None and self._fingerprint() == self.fingerprint:
+            self._scan()
         else:
-            getattr(this_module, f"process_{k}_list")(hdf5_file, v)
+            self.build()
+        return self
 
-def process_olga_version_list(hdf5_file, olga_version_list):
-    h5py.File(f"{hdf5_file}.h5", 'a')['olga_version'] = olga_version_list[0]
+    def _scan(self):
+        # newline positions from the last complete time step to the end of
+        # the file, found in vectorised chunks
+        stat = self.path.stat()
+        starts = [np.array([self.end], dtype=np.int64)]
+        with open(self.path, "rb") as f:
+            if stat.st_size > self.end:
+                with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                    pos = self.end
+                    while pos < stat.st_size:
+                        count = min(self.scan_bytes, stat.st_size - pos)
+                        buffer = np.frombuffer(mm, dtype=np.uint8, count=count, offset=pos)
+                        starts.append(np.flatnonzero(buffer == 10).astype(np.int64) + pos + 1)
+                        pos += count
+                        del buffer
+        bounds = np.concatenate(starts)
+        lengths = np.diff(bounds)
+        blank = lengths <= 2  # "\n" or "\r\n" between data lines
+        if blank.any():
+            # fold blank lines into the line before them
+            bounds = bounds[np.concatenate([~blank, [True]])]
+        n_lines = len(bounds) - 1
+        n_steps = n_lines // self.step_lines
+        new = bounds[: n_steps * self.step_lines + 1]
+        self.lines = np.concatenate([self.lines, new[:-1]])
+        self.end = int(new[-1])
+        self.times = np.concatenate([self.times, self._read_times(new[:-1:self.step_lines])])
+        self.size = stat.st_size
+        self.mtime_ns = stat.st_mtime_ns
+        self.fingerprint = self._fingerprint()
 
-def process_date_list(store, date_list):
-    store['date'] = parser.parse(date_list[0], yearfirst=True)
+    def _fingerprint(self):
+        # the header and the last indexed time step, as they are now on disk
+        last = int(self.lines[-self.step_lines]) if len(self.lines) else self.header_end
+        with open(self.path, "rb") as f:
+            digest = hashlib.sha1(f.read(self.header_end))
+            f.seek(last)
+            digest.update(f.read(self.end - last))
+        return digest.hexdigest()
 
-def process_network_list(store, network_list):
-    store['network'] = int(network_list[0])
+    def _read_times(self, offsets):
+        with open(self.path, "rb") as f:
+            times = np.empty(len(offsets))
+            for n, offset in enumerate(offsets):
+                f.seek(offset)
+                times[n] = float(f.readline().split(None, 1)[0])
+        return times
+
+    def line_range(self, step, row=0):
+        """(start, stop) bytes of line `row` of time step `step`."""
+        n = step * self.step_lines + row
+        stop = self.lines[n + 1] if n + 1 < len(self.lines) else self.end
+        return int(self.lines[n]), int(stop)
+
+    def step_range(self, step):
+        """(start, stop) bytes of all the lines of time step `step`."""
+        start, _ = self.line_range(step)
+        _, stop = self.line_range(step, self.step_lines - 1)
+        return start, stop
+
+    def read(self, start, stop):
+        with open(self.path, "rb") as f:
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                return mm[start:stop].decode()
+
+    def save(self, index_path):
+        meta = {
+            "version": self.version,
+            "plot": self.plot,
+            "step_lines": self.step_lines,
+            "blocks": self.blocks,
+            "time_series": self.time_series,
+            "header_end": self.header_end,
+            "end": self.end,
+            "size": self.size,
+            "mtime_ns": self.mtime_ns,
+            "fingerprint": self.fingerprint,
+        }
+        with open(index_path, "wb") as f:
+            np.savez(f, meta=np.array(json.dumps(meta)), lines=self.lines, times=self.times)
+
+    @staticmethod
+    def load(path, index_path):
+        index = PlotIndex(path)
+        with np.load(index_path) as data:
+            meta = json.loads(str(data["meta"]))
+            if meta["version"] != PlotIndex.version:
+                raise Exception(f"Unsupported index version {meta['version']}.")
+            index.lines = data["lines"]
+            index.times = data["times"]
+        index.blocks = [tuple(b) for b in meta["blocks"]]
+        for k in ["plot", "step_lines", "time_series", "header_end", "end", "size", "mtime_ns", "fingerprint"]:
+            setattr(index, k, meta[k])
+        return index
+
+
+def index_path_for(path):
+    path = Path(path)
+    return path.with_name(f"{path.name}.idx.npz")
+
+
+def load_index(path, index_path=None):
+    """
+    The byte-offset index of a plot file, read from its sidecar if present
+    and updated (and re-saved) if the file has changed since. Where the
+    sidecar cannot be written (a read-only directory) the index is kept in
+    memory only.
+    """
+    if index_path is None:
+        index_path = index_path_for(path)
+    index = None
+    if Path(index_path).exists():
+        try:
+            index = PlotIndex.load(path, index_path)
+        except Exception:
+            index = None
+    if index is None:
+        index = PlotIndex(path).build()
+        _save_index(index, index_path)
+    else:
+        size, mtime_ns = index.size, index.mtime_ns
+        index.update()
+        if (index.size, index.mtime_ns) != (size, mtime_ns):
+            _save_index(index, index_path)
+    return index
+
+
+def _save_index(index, index_path):
+    try:
+        index.save(index_path)
+    except OSError:
+        pass
+
+
+def hdf5_path_for(path):
+    path = Path(path)
+    return path.with_name(f"{path.name}.h5")
+
+
+def _build_hdf5(hdf5, records, dtype=np.float64, compression="gzip"):
+    writer = HDF5Writer(hdf5, dtype, compression=compression)
+    writer.write(records)
+    return writer
+
+
+def verify_precision(ppl_path, hdf5_path=None, digits=6):
+    """
+    Compare a store with the values printed in its source file, streaming
+    both. Returns the largest round-trip error in units of the last of the
+    `digits` significant digits printed; up to 0.5 means every stored value
+    rounds back to the printed one, as float32 does for OLGA's 6 digits.
+    """
+    if hdf5_path is None:
+        hdf5_path = hdf5_path_for(ppl_path)
+    with h5py.File(hdf5_path, "r") as hdf5:
+        check = PrecisionCheck(hdf5, digits)
+        check.write(iter_records(ppl_path))
+    if check.rows != check.stored_rows:
+        raise Exception(f"Store has {check.stored_rows} time steps, {ppl_path} has {check.rows}.")
+    return check.worst
+
+
+def iter_records(path, offset=None, follow=False, select=None):
+    """
+    Walk an OLGA plot file once, line by line, yielding typed records.
+
+    Yields a Header for each header keyword, a Branch for each BRANCH block,
+    a Catalog (profile plots) or Trend (trend plots) for each CATALOG entry,
+    and either a TimeStep per profile time step or a TrendRows per chunk of
+    trend rows, so only one block of the TIME SERIES is ever held in memory.
+    Each TimeStep and TrendRows records the byte offset just past its block.
+
+    With `offset` (the `end` of a previously read block) the TIME SERIES is
+    resumed from that byte instead of its start. With `follow=True` a
+    trailing partial line or time step, as left by OLGA while it is still
+    writing, is ignored rather than treated as an error.
+
+    `select`, if given, is called with the list of catalog items and returns
+    the numbers of those to keep (or None for all); only they are yielded and, for profile
+    plots, only their rows are kept in each TimeStep block.
+    """
+    with open(path, "rb") as f:
+        yield from _tokenize(_Lines(f, follow), offset, select)
+
+
+class _Lines:
+    """Stripped lines of a binary file, tracking the byte offset consumed."""
+
+    def __init__(self, f, follow=False):
+        self.f = f
+        self.follow = follow
+        self.offset = f.tell()
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        line = self.f.readline()
+        if not line or (self.follow and not line.endswith(b"\n")):
+            self.f.seek(self.offset)
+            raise StopIteration
+        self.offset += len(line)
+        return line.decode().strip()
+
+    def seek(self, offset):
+        self.f.seek(offset)
+        self.offset = offset
+
+
+def _tokenize(lines, offset=None, select=None):
+    plot = None
+    step_lines = 1
+    rows = None
+    for line in lines:
+        if not line:
+            continue
+        if line.startswith("'OLGA"):
+            yield Header("olga_version", _unquote(line)[len("OLGA "):])
+        elif line in plot_kinds:
+            plot = line
+            yield Header("plot", line)
+        elif line in string_keywords:
+            yield Header(string_keywords[line], _unquote(next(lines)))
+        elif line == "NETWORK":
+            yield Header("network", next(lines))
+        elif line.startswith("GEOMETRY"):
+            yield Header("geometry", _unquote(line[len("GEOMETRY"):]).strip())
+        elif line == "BRANCH":
+            yield _read_branch(lines)
+        elif line.startswith("CATALOG"):
+            count = int(next(lines))
+            parse_item = _parse_trend_line if plot == "TIME PLOT" else _parse_catalog_line
+            catalog = [parse_item(next(lines)) for _ in range(count)]
+            rows = None if select is None else select(catalog)
+            if rows is not None:
+                catalog = [catalog[n] for n in rows]
+            yield from catalog
+            step_lines = 1 + count
+        elif line.startswith("TIME SERIES"):
+            if offset is not None and offset > lines.offset:
+                lines.seek(offset)
+            if plot == "TIME PLOT":
+                yield from _read_trend_rows(lines)
+            else:
+                yield from _read_time_steps(lines, step_lines, rows)
+        else:
+            raise Exception(f"Unrecognised line in OLGA plot file: {line[:80]}")
+
+
+def _unquote(s):
+    return s.strip().strip("'")
+
+
+def _read_branch(lines):
+    name = _unquote(next(lines))
+    count = int(next(lines))
+    n_values = 2 * (count + 1)
+    values = []
+    while len(values) < n_values:
+        values.extend(next(lines).split())
+    vals = np.array(values, dtype=np.float64)
+    return Branch(name, count, np.split(vals, 2))
+
+
+def _parse_catalog_line(line):
+    tokens = [_unquote(t) for t in catalog_item_re.findall(line)]
+    if len(tokens) != 6 or tokens[2] != "BRANCH:":
+        raise Exception(f"Unrecognised catalog item: {line}")
+    return Catalog(tokens[0], tokens[1].rstrip(":"), tokens[3], tokens[4][1:-1], tokens[5])
 
-def process_branch_list(self, branch_list):
-    for branch in branch_list:
-        name = branch[0]
-        count = int(branch[1])
-        vals = np.array(branch[2].split(), dtype=np.float)
-        values = np.split(vals, len(vals) / (count + 1))
-        self.branches.append(Branch(name, count, values))
-    if len(self.branches) != self.network:
-        raise Exception(
-            f"Number of branches ({len(self.branches)}) does not equal value in PPL file ({self.network})."
-        )
 
-def process_catalog_list(self, catalog_list):
-    catalog_length = int(catalog_list[0][0])
-    catalog_item_re = re.compile(
-        r"(.+) \s*\'(BOUNDARY|SECTION):\'\s*\'BRANCH:\'\s*\'(.*)\'\s*\'\((.*)\)\'\s*\'(.*)\'"
-    )
-    self.catalog = catalog_item_re.findall(catalog_list[0][1])
-    if len(self.catalog) != catalog_length:
+def _parse_trend_line(line):
+    # SYMBOL 'KIND:' 'LOCATION' ... '(UNITS)' 'DESCRIPTION', or SYMBOL 'GLOBAL' '(UNITS)' 'DESCRIPTION'
+    tokens = [_unquote(t) for t in catalog_item_re.findall(line)]
+    if len(tokens) < 4 or not tokens[-2].startswith("("):
+        raise Exception(f"Unrecognised catalog item: {line}")
+    location = " ".join(tokens[2:-2])
+    return Trend(tokens[0], tokens[1].rstrip(":"), location, tokens[-2][1:-1], tokens[-1])
+
+
+def _read_time_steps(lines, step_lines, rows=None):
+    block = []
+    for line in lines:
+        if not line:
+            continue
+        block.append(line)
+        if len(block) == step_lines:
+            values = block[1:] if rows is None else [block[1 + n] for n in rows]
+            yield TimeStep(float(block[0]), "\n".join(values), lines.offset)
+            block = []
+    if block and not lines.follow:
         raise Exception(
-            f"Number of catalogue items ({len(self.catalog)}) does not equal value in PPL file ({int(catalog[1])})."
+            f"Incomplete time step at end of file ({len(block)} of {step_lines} lines)."
         )
 
-def process_time_series_list(self, time_series_list):
-    # convert time series data to a list of floats for time value and Pandas Series' for time series data
-    time_series = [
-        np.array(r.split(), dtype=np.float)
-        if n % (len(self.catalog) + 1) > 0
-        else float(r)
-        for n, r in enumerate(time_series_list[0].split("\n")[1:])
-    ]
-    times = []
-    series = []
-    for n, v in enumerate(time_series):
-        if n % (len(self.catalog) + 1) == 0:
-            times.append(v)
-        else:
-            series.append(v)
 
-    d = {
-        "times": list(
-            itertools.chain.from_iterable(
-                itertools.repeat(x, len(self.catalog)) for x in times
+def _read_trend_rows(lines, chunk_rows=1024):
+    # every TPL row is one line holding the time followed by one value per catalog item
+    block = []
+    for line in lines:
+        if not line:
+            continue
+        block.append(line)
+        if len(block) == chunk_rows:
+            yield TrendRows(len(block), "\n".join(block), lines.offset)
+            block = []
+    if block:
+        yield TrendRows(len(block), "\n".join(block), lines.offset)
+
+
+def catalog_widths(branches, catalog):
+    """
+    Number of values in each catalog row: one per node for BOUNDARY variables
+    and one per section for SECTION variables.
+    """
+    counts = {b.name: b.count for b in branches}
+    return [counts[c.branch] + 1 if c.kind == "BOUNDARY" else counts[c.branch] for c in catalog]
+
+
+class TimeSeriesDecoder:
+    """
+    Decodes TimeStep records into a single contiguous (n_times, width) array.
+
+    Each time step block is converted in one call to np.fromstring and copied
+    into a preallocated row. The row width comes from the catalog and branch
+    counts; the number of rows is estimated from the file size and the size
+    of the first block, and only grows (by doubling) if that estimate is low.
+    """
+
+    def __init__(self, widths, dtype=np.float64, size_hint=None):
+        self.offsets = np.concatenate([[0], np.cumsum(widths, dtype=np.int64)])
+        self.width = int(self.offsets[-1])
+        self.dtype = np.dtype(dtype)
+        self.size_hint = size_hint
+        self.count = 0
+        self._times = None
+        self._values = None
+
+    def clear(self):
+        self.count = 0
+
+    def append(self, time_step):
+        with metrics.stage("decode", len(time_step.block)):
+            row = np.fromstring(time_step.block, dtype=self.dtype, sep=" ")
+        if row.size != self.width:
+            raise Exception(
+                f"Time step {time_step.time} has {row.size} values, expected {self.width}."
+            )
+        if self._values is None:
+            self._allocate(self._estimate_rows(time_step))
+        elif self.count == len(self._times):
+            self._allocate(2 * self.count)
+        self._times[self.count] = time_step.time
+        self._values[self.count] = row
+        self.count += 1
+
+    def extend(self, trend_rows, columns=None, t_start=None, t_end=None):
+        """
+        Append a block of rows that each hold the time followed by the values,
+        keeping only the value `columns` given and rows with
+        t_start <= time <= t_end.
+        """
+        with metrics.stage("decode", len(trend_rows.block)):
+            table = np.fromstring(trend_rows.block, dtype=np.float64, sep=" ")
+        n_columns = self.width + 1 if columns is None else table.size // max(trend_rows.rows, 1)
+        if table.size != trend_rows.rows * n_columns:
+            raise Exception(
+                f"Trend block has {table.size} values, expected {trend_rows.rows} rows of {n_columns}."
             )
-        ),
-        "symbol": [str(c[0]) for c in self.catalog] * len(times),
-        "kind": [c[1] for c in self.catalog] * len(times),
-        "branch": [c[2] for c in self.catalog] * len(times),
-        "units": [c[3] for c in self.catalog] * len(times),
-        "description": [c[4] for c in self.catalog] * len(times),
-        "data": series,
-    }
-    self.time_series = pd.DataFrame(data=d)
+        table = table.reshape(trend_rows.rows, n_columns)
+        if columns is not None:
+            table = table[:, np.concatenate([[0], np.asarray(columns, dtype=np.int64) + 1])]
+        if t_start is not None or t_end is not None:
+            keep = np.ones(len(table), dtype=bool)
+            if t_start is not None:
+                keep &= table[:, 0] >= t_start
+            if t_end is not None:
+                keep &= table[:, 0] <= t_end
+            table = table[keep]
+        if len(table) == 0:
+            return
+        needed = self.count + len(table)
+        if self._values is None:
+            self._allocate(max(needed, self._estimate_rows(trend_rows) * trend_rows.rows))
+        elif needed > len(self._times):
+            self._allocate(max(needed, 2 * self.count))
+        self._times[self.count : needed] = table[:, 0]
+        self._values[self.count : needed] = table[:, 1:]
+        self.count = needed
 
+    def _estimate_rows(self, record):
+        if self.size_hint is None:
+            return 64
+        return self.size_hint // (len(record.block) + 1) + 1
 
+    def _allocate(self, rows):
+        times = np.empty(rows, dtype=np.float64)
+        values = np.empty((rows, self.width), dtype=self.dtype)
+        if self._values is not None:
+            times[: self.count] = self._times[: self.count]
+            values[: self.count] = self._values[: self.count]
+        metrics.allocated("decode", times, values)
+        self._times = times
+        self._values = values
 
-class PPL:
-    def __init__(self, path):
+    @property
+    def times(self):
+        if self._times is None:
+            return np.empty(0, dtype=np.float64)
+        return self._times[: self.count]
+
+    @property
+    def values(self):
+        if self._values is None:
+            return np.empty((0, self.width), dtype=self.dtype)
+        return self._values[: self.count]
+
+    def item(self, n):
+        """View of the (n_times, n_values) block for catalog item n."""
+        return self.values[:, self.offsets[n] : self.offsets[n + 1]]
+
+
+def _decode_steps(path, start, stop, rows, times_name, values_name, shape, dtype):
+    """
+    Decode the time steps (or trend rows) in bytes [start, stop) of `path`
+    into `rows` of the shared (n_times,) times and (n_times, width) values
+    arrays. Each step is a time followed by `width` values, so the whole
+    range is converted by one np.fromstring call.
+    """
+    with open(path, "rb") as f:
+        f.seek(start)
+        table = np.fromstring(f.read(stop - start).decode(), dtype=np.float64, sep=" ")
+    n, width = rows.stop - rows.start, shape[1]
+    if table.size != n * (width + 1):
+        raise Exception(f"Bytes {start}-{stop} hold {table.size} values, expected {n} steps of {width}.")
+    table = table.reshape(n, width + 1)
+    times_shm = shared_memory.SharedMemory(name=times_name)
+    values_shm = shared_memory.SharedMemory(name=values_name)
+    try:
+        np.ndarray(shape[:1], np.float64, times_shm.buf)[rows] = table[:, 0]
+        np.ndarray(shape, dtype, values_shm.buf)[rows] = table[:, 1:]
+    finally:
+        times_shm.close()
+        values_shm.close()
+
+
+def interp_weights(x, new_x):
+    """
+    Indices i, j and weights w with new_x = x[i] * (1 - w) + x[j] * w along
+    the sorted axis `x`, new_x being clamped to the range of x.
+    """
+    x = np.asarray(x)
+    new_x = np.asarray(new_x, dtype=np.float64)
+    if len(x) < 2:
+        zeros = np.zeros(new_x.shape, dtype=np.int64)
+        return zeros, zeros, np.zeros(new_x.shape)
+    new_x = np.clip(new_x, x[0], x[-1])
+    i = np.clip(np.searchsorted(x, new_x, side="right") - 1, 0, len(x) - 2)
+    w = (new_x - x[i]) / (x[i + 1] - x[i])
+    return i, i + 1, w
+
+
+def branch_columns(branch, catalog, offsets, kind):
+    """
+    Indices of the `kind` variables of `branch` in a decoded row, as a
+    (nodes, vars) array so that `values[:, idx]` gathers a (time, node, var)
+    block in one operation.
+    """
+    items = [n for n, c in enumerate(catalog) if c.branch == branch.name and c.kind == kind]
+    nodes = branch.count + 1 if kind == "BOUNDARY" else branch.count
+    idx = np.asarray(offsets)[items][np.newaxis, :] + np.arange(nodes)[:, np.newaxis]
+    return items, idx
+
+
+def branch_targets(branches, catalog, offsets):
+    """
+    (branch, kind, catalog items, gather indices) for every branch and kind
+    with at least one variable in the catalog.
+    """
+    for branch in branches:
+        for kind in ["BOUNDARY", "SECTION"]:
+            items, idx = branch_columns(branch, catalog, offsets, kind)
+            if items:
+                yield branch, kind, items, idx
+
+
+class HDF5Writer:
+    """
+    Streams OLGA plot records into an open HDF5 file.
+
+    Layout::
+
+        /                         header fields as attributes
+        /time                     (time,)
+        /catalog/<field>          one string dataset per catalog field
+        /branches/<name>/geometry (node, 2) Length and Elevation
+        /branches/<name>/boundary (time, node, var) BOUNDARY variables
+        /branches/<name>/section  (time, node, var) SECTION variables
+        /trends                   (time, var) trend plot variables
+        /pyramid/<dataset>/<k>    decimation levels (see build_pyramid)
+        /summary/<statistic>      per catalog item statistics (see SummaryStats)
+
+    Time series datasets are compressed (gzip unless `compression` names
+    another of `compressions`), chunked along time and resizable, so time
+    steps are written (and can later be appended) in blocks of `buffer_rows`
+    without holding the whole series in memory.
+    """
+
+    layout_version = 1
+    chunk_bytes = 2 ** 20
+
+    def __init__(self, hdf5, dtype=np.float64, buffer_rows=256, compression="gzip"):
+        self.hdf5 = hdf5
+        self.dtype = np.dtype(dtype)
+        self.buffer_rows = buffer_rows
+        self.compression = compression
+        self.filters = compression_filters(compression)
+        self.branches = []
+        self.catalog = []
+        self._decoder = None
+        self._last_time = hdf5["time"][-1] if "time" in hdf5 and len(hdf5["time"]) else -np.inf
+        self._offset = None
+
+    def write(self, records):
+        for record in records:
+            getattr(self, f"process_{type(record).__name__.lower()}")(record)
+        self.flush()
+        self._write_summary()
+
+    def _write_summary(self):
+        if self._decoder is not None:
+            self.summary.save(self.hdf5)
+
+    def process_header(self, header):
+        self.hdf5.attrs[header.keyword] = header.value
+
+    def process_branch(self, branch):
+        self.branches.append(branch)
+        if "branches" not in self.hdf5:
+            self.hdf5.create_group("branches", track_order=True)
+        group = self.hdf5.require_group(f"branches/{branch.name}")
+        group.attrs["count"] = branch.count
+        if "geometry" not in group:
+            group.create_dataset("geometry", data=np.stack(branch.values, axis=1), **self.filters)
+
+    def process_catalog(self, catalog):
+        self.catalog.append(catalog)
+
+    def process_trend(self, trend):
+        self.catalog.append(trend)
+
+    def process_timestep(self, time_step):
+        if self._decoder is None:
+            self._start_time_series(catalog_widths(self.branches, self.catalog))
+        self._offset = time_step.end
+        if time_step.time <= self._last_time:
+            return
+        self._decoder.append(time_step)
+        if self._decoder.count == self.buffer_rows:
+            self.flush()
+
+    def process_trendrows(self, trend_rows):
+        if self._decoder is None:
+            self._start_time_series([1] * len(self.catalog))
+        self._decoder.extend(trend_rows)
+        self._offset = trend_rows.end
+        if self._decoder.count >= self.buffer_rows:
+            self.flush()
+
+    def _start_time_series(self, widths):
+        self._write_layout()
+        self._decoder = TimeSeriesDecoder(widths, dtype=self.dtype)
+        self._targets = []
+        self.summary = SummaryStats.load(self.hdf5, len(self.catalog))
+        if isinstance(self.catalog[0], Trend):
+            dataset = self._dataset("trends", (len(self.catalog),))
+            self._targets.append((dataset, None, list(range(len(self.catalog))), None))
+        else:
+            offsets = self._decoder.offsets[:-1]
+            for branch, kind, items, idx in branch_targets(self.branches, self.catalog, offsets):
+                name = f"branches/{branch.name}/{kind.lower()}"
+                dataset = self._dataset(
+                    name,
+                    idx.shape,
+                    symbols=[self.catalog[n].symbol for n in items],
+                    units=[self.catalog[n].units for n in items],
+                )
+                self._targets.append((dataset, idx, items, branch.positions(kind)))
+        self._dataset("time", ())
+
+    def _write_layout(self):
+        self.hdf5.attrs["layout_version"] = self.layout_version
+        self.hdf5.attrs.setdefault("compression", self.compression)
+        self._write_catalog()
+
+    def _write_catalog(self):
+        fields = [f for f in self.catalog[0].__dataclass_fields__ if f != "data"]
+        group = self.hdf5.require_group("catalog")
+        for f in fields:
+            values = [getattr(c, f) for c in self.catalog]
+            if f in group:
+                if list(group[f].asstr()[...]) != values:
+                    raise Exception(f"Catalog {f} does not match the existing store.")
+            else:
+                group.create_dataset(f, data=values, dtype=h5py.string_dtype())
+
+    def _dataset(self, name, shape, **attrs):
+        if name in self.hdf5:
+            return self.hdf5[name]
+        dtype = np.float64 if name == "time" else self.dtype
+        row_bytes = max(int(np.prod(shape)) * np.dtype(dtype).itemsize, 1)
+        rows = int(np.clip(self.chunk_bytes // row_bytes, 1, 4096))
+        dataset = self.hdf5.create_dataset(
+            name,
+            shape=(0,) + shape,
+            maxshape=(None,) + shape,
+            chunks=(rows,) + shape,
+            dtype=dtype,
+            **self.filters,
+        )
+        dataset.attrs.update(attrs)
+        return dataset
+
+    def flush(self):
+        if self._offset is not None:
+            self.hdf5.attrs["source_offset"] = self._offset
+        if self._decoder is None or self._decoder.count == 0:
+            return
+        times = self._decoder.times
+        values = self._decoder.values
+        keep = times > self._last_time
+        if not keep.all():
+            times, values = times[keep], values[keep]
+        if len(times):
+            with metrics.stage("hdf5_write", values.nbytes):
+                self._append(self.hdf5["time"], times)
+                for dataset, idx, items, positions in self._targets:
+                    block = values if idx is None else values[:, idx]
+                    self._append(dataset, block)
+                    self.summary.update(items, times, block, positions)
+            self._last_time = times[-1]
+        self._decoder.clear()
+
+    @staticmethod
+    def _append(dataset, block):
+        start = dataset.shape[0]
+        dataset.resize(start + len(block), axis=0)
+        dataset[start:] = block
+
+
+class SummaryStats:
+    """
+    Running statistics of every catalog item, updated block by block as
+    time steps are decoded: the min and max over all times and positions
+    with the time and position (NaN for trends) where they occur, the mean,
+    and the final value (for profiles, the mean along the branch at the
+    last time step).
+    """
+
+    statistics = ["min", "max", "mean", "time_min", "time_max", "position_min", "position_max", "final", "count"]
+
+    def __init__(self, n):
+        self.min = np.full(n, np.inf)
+        self.max = np.full(n, -np.inf)
+        self.sum = np.zeros(n)
+        self.count = np.zeros(n, dtype=np.int64)
+        self.time_min = np.full(n, np.nan)
+        self.time_max = np.full(n, np.nan)
+        self.position_min = np.full(n, np.nan)
+        self.position_max = np.full(n, np.nan)
+        self.final = np.full(n, np.nan)
+
+    @property
+    def mean(self):
+        with np.errstate(invalid="ignore", divide="ignore"):
+            return self.sum / self.count
+
+    def update(self, items, times, block, positions=None):
+        """Add a (time, var) or (time, node, var) `block` of catalog `items`."""
+        if len(times) == 0:
+            return
+        items = np.asarray(items)
+        n_times = len(times)
+        flat = block.reshape(n_times, -1, block.shape[-1])
+        nodes = flat.shape[1]
+        flat = flat.reshape(n_times * nodes, -1).astype(np.float64, copy=False)
+        for statistic, better, pick in [("min", np.less, np.argmin), ("max", np.greater, np.argmax)]:
+            at = pick(flat, axis=0)
+            value = flat[at, np.arange(flat.shape[1])]
+            new = better(value, getattr(self, statistic)[items])
+            getattr(self, statistic)[items[new]] = value[new]
+            getattr(self, f"time_{statistic}")[items[new]] = times[at[new] // nodes]
+            if positions is not None:
+                getattr(self, f"position_{statistic}")[items[new]] = positions[at[new] % nodes]
+        self.sum[items] += flat.sum(axis=0)
+        self.count[items] += flat.shape[0]
+        self.final[items] = flat[-nodes:].mean(axis=0)
+
+    def save(self, hdf5):
+        group = hdf5.require_group("summary")
+        for statistic in self.statistics:
+            if statistic in group:
+                del group[statistic]
+            group.create_dataset(statistic, data=getattr(self, statistic))
+
+    @classmethod
+    def load(cls, hdf5, n):
+        """The statistics saved in a store, or new ones if it has none."""
+        stats = cls(n)
+        group = hdf5.get("summary")
+        if group is not None and all(s in group and len(group[s]) == n for s in cls.statistics):
+            for statistic in cls.statistics:
+                if statistic != "mean":
+                    setattr(stats, statistic, group[statistic][...])
+            stats.sum = group["mean"][...] * stats.count
+            stats.sum[stats.count == 0] = 0.0
+        return stats
+
+
+class PrecisionCheck(HDF5Writer):
+    """
+    Decodes a plot file as HDF5Writer would, but in float64 and comparing
+    each block of time steps with an existing store instead of writing it.
+    """
+
+    def __init__(self, hdf5, digits=6):
+        super().__init__(hdf5, np.float64)
+        self.digits = digits
+        self.rows = 0
+        self.worst = 0.0
+        self.stored_rows = hdf5["time"].shape[0]
+        self._last_time = -np.inf
+
+    def process_header(self, header):
+        pass
+
+    def process_branch(self, branch):
+        self.branches.append(branch)
+
+    def _write_layout(self):
+        pass
+
+    def _write_summary(self):
+        pass
+
+    def _dataset(self, name, shape, **attrs):
+        return self.hdf5[name]
+
+    def flush(self):
+        if self._decoder is None or self._decoder.count == 0:
+            return
+        values = self._decoder.values
+        rows = slice(self.rows, self.rows + len(values))
+        self.rows = rows.stop
+        for dataset, idx, _, _ in self._targets:
+            printed = values if idx is None else values[:, idx]
+            self.worst = max(self.worst, self._error(dataset[rows], printed))
+        self._decoder.clear()
+
+    def _error(self, stored, printed):
+        if stored.shape != printed.shape:
+            raise Exception(f"Store rows {stored.shape} do not match the file's {printed.shape}.")
+        magnitude = np.abs(printed)
+        exponent = np.floor(np.log10(np.where(magnitude > 0, magnitude, 1.0)))
+        unit = 10.0 ** (exponent - (self.digits - 1))
+        error = np.abs(stored.astype(np.float64) - printed) / unit
+        return float(error.max()) if error.size else 0.0
+
+
+class OlgaPlot:
+    """Header, branches and catalog common to OLGA profile and trend plots."""
+
+    def __init__(self, path, dtype=np.float64, variables=None, locations=None, t_start=None, t_end=None):
         self.path = path
+        self.dtype = dtype
+        self.variables = variables
+        self.locations = locations
+        self.t_start = t_start
+        self.t_end = t_end
         self.initialise_variables()
 
     def initialise_variables(self):
         self.olga_version = None
+        self.plot = None
         self.input_file = None
+        self.pvt_file = None
         self.restart_file = None
         self.date = None
         self.project = None
         self.title = None
         self.author = None
         self.network = None
+        self.geometry = None
         self.branches = []
         self.catalog = []
-        self.time_series = None
+        self.times = None
+        self.values = None
+        self.offset = None
 
-    def parse(self):
-        with open(self.path, "r") as f:
-            data = f.read()
+    def parse(self, follow=False, header_only=False):
+        records = iter_records(self.path, follow=follow, select=self._select)
+        if header_only:
+            records = _header_records(records)
+        with metrics.stage("parse", os.path.getsize(self.path)):
+            self.build_object(records)
 
-        matches = {
-            k: v
-            for k, v in {k: rx.findall(data) for k, rx in regex.items()}.items()
-            if len(v) > 0
-        }
-        #self.build_object(matches)
+    def parse_parallel(self, workers=None, chunk_bytes=64 * 2 ** 20):
+        """
+        Parse with the TIME SERIES decoded by a pool of `workers` processes.
 
-    def build_hdf5(self, matches):
-        store = pd.HDFStore('test.h5')
-        
+        The byte-offset index gives the start of every time step, so the
+        series is cut at step boundaries into ranges of about `chunk_bytes`
+        (at least one per worker), each decoded independently straight into
+        a shared-memory (time, width) array that is then gathered into the
+        plot's arrays. Only whole time steps with t_start <= time <= t_end
+        are read; variable and location selection are not supported.
+        """
+        if self.variables is not None or self.locations is not None:
+            raise Exception("Parallel parsing reads every variable; select them with get() instead.")
+        self.parse(header_only=True)
+        workers = workers or os.cpu_count()
+        index = self.index()
+        i0 = 0 if self.t_start is None else int(np.searchsorted(index.times, self.t_start, side="left"))
+        i1 = len(index) if self.t_end is None else int(np.searchsorted(index.times, self.t_end, side="right"))
+        steps = range(i0, max(i0, i1))
+        starts = np.append(index.lines[:: index.step_lines], index.end)
+        width = int(np.sum(self.widths()))
+        shape = (len(steps), width)
+        times_shm = shared_memory.SharedMemory(create=True, size=max(shape[0] * 8, 1))
+        values_shm = shared_memory.SharedMemory(
+            create=True, size=max(shape[0] * width * np.dtype(self.dtype).itemsize, 1)
+        )
+        try:
+            if len(steps):
+                with metrics.stage("parallel_decode", int(starts[steps.stop] - starts[steps.start])):
+                    self._decode_parallel(steps, starts, shape, workers, chunk_bytes, times_shm, values_shm)
+            times = np.ndarray(shape[:1], np.float64, times_shm.buf)
+            values = np.ndarray(shape, self.dtype, values_shm.buf)
+            with metrics.stage("finalise"):
+                self.set_time_series(times, values)
+            del times, values
+            self.offset = int(starts[steps.stop])
+        finally:
+            for shm in [times_shm, values_shm]:
+                shm.close()
+                shm.unlink()
 
+    def _decode_parallel(self, steps, starts, shape, workers, chunk_bytes, times_shm, values_shm):
+        offsets = starts[steps.start : steps.stop + 1]
+        chunk_bytes = max(1, min(chunk_bytes, (offsets[-1] - offsets[0]) // workers))
+        cuts = np.searchsorted(offsets, np.arange(offsets[0], offsets[-1], chunk_bytes), side="right") - 1
+        cuts = np.unique(np.append(cuts, len(offsets) - 1))
+        with ProcessPoolExecutor(max_workers=min(workers, len(cuts) - 1)) as pool:
+            futures = [
+                pool.submit(
+                    _decode_steps,
+                    self.path,
+                    int(offsets[i0]),
+                    int(offsets[i1]),
+                    slice(int(i0), int(i1)),
+                    times_shm.name,
+                    values_shm.name,
+                    shape,
+                    self.dtype,
+                )
+                for i0, i1 in zip(cuts[:-1], cuts[1:])
+            ]
+            for future in futures:
+                future.result()
 
+    def set_time_series(self, times, values):
+        """Copy decoded (time,) times and (time, width) rows into the plot."""
+        raise NotImplementedError
 
-    def build_object(self, matches):
-        standard_strings = ["input_file", "restart_file", "project", "title", "author"]
-        for k, v in matches.items():
-            if k in standard_strings:
-                setattr(self, k, v[0])
-            else:
-                getattr(self, f"process_{k}_list")(v)
+    def _select(self, catalog):
+        # catalog rows kept when only some variables or branches/locations are requested
+        if self.variables is None and self.locations is None:
+            self._rows = None
+        else:
+            self._rows = [
+                n for n, c in enumerate(catalog)
+                if (self.variables is None or c.symbol in self.variables)
+                and (self.locations is None or self._location(c) in self.locations)
+            ]
+        return self._rows
+
+    def _in_window(self, time):
+        """False before t_start; raises _EndOfWindow past t_end."""
+        if self.t_end is not None and time > self.t_end:
+            raise _EndOfWindow
+        return self.t_start is None or time >= self.t_start
+
+    def load_hdf5(self, hdf5_path):
+        """
+        Attach to a store written by HDF5Writer without reading the time
+        series: variables are read from disk only for the slices indexed.
+        """
+        self._hdf5 = h5py.File(hdf5_path, "r")
+        for k, v in self._hdf5.attrs.items():
+            if k != "layout_version":
+                self.process_header(Header(k, v))
+        for name, group in self._hdf5["branches"].items():
+            geometry = group["geometry"][...]
+            self.branches.append(Branch(name, int(group.attrs["count"]), [geometry[:, 0], geometry[:, 1]]))
+        catalog = self._hdf5["catalog"]
+        item = Trend if "trends" in self._hdf5 else Catalog
+        fields = [catalog[f].asstr()[...] for f in item.__dataclass_fields__ if f != "data"]
+        self.catalog = [item(*values) for values in zip(*fields)]
+        self.times = self._hdf5["time"][...]
+        with metrics.stage("attach"):
+            self.attach()
+
+    def attach(self):
+        pass
+
+    def read_all(self):
+        """Read the whole attached store into memory and close it."""
+        raise NotImplementedError
 
-    def process_olga_version_list(self, olga_version_list):
-        self.olga_version = olga_version_list[0]
+    def close(self):
+        hdf5 = getattr(self, "_hdf5", None)
+        if hdf5 is not None:
+            hdf5.close()
+            self._hdf5 = None
 
-    def process_date_list(self, date_list):
-        self.date = parser.parse(date_list[0], yearfirst=True)
+    def __enter__(self):
+        return self
 
-    def process_network_list(self, network_list):
-        self.network = int(network_list[0])
+    def __exit__(self, *args):
+        self.close()
 
-    def process_branch_list(self, branch_list):
-        for branch in branch_list:
-            name = branch[0]
-            count = int(branch[1])
-            vals = np.array(branch[2].split(), dtype=np.float)
-            values = np.split(vals, len(vals) / (count + 1))
-            self.branches.append(Branch(name, count, values))
+    def build_object(self, records):
+        self._decoder = None
+        try:
+            for record in records:
+                getattr(self, f"process_{type(record).__name__.lower()}")(record)
+        except _EndOfWindow:
+            records.close()
         if len(self.branches) != self.network:
             raise Exception(
-                f"Number of branches ({len(self.branches)}) does not equal value in PPL file ({self.network})."
+                f"Number of branches ({len(self.branches)}) does not equal value in {type(self).__name__} file ({self.network})."
             )
+        if self._decoder is None:
+            self._decoder = self._new_decoder()
+        with metrics.stage("finalise"):
+            self.finalise()
+        del self._decoder
 
-    def process_catalog_list(self, catalog_list):
-        catalog_length = int(catalog_list[0][0])
-        catalog_item_re = re.compile(
-            r"(.+) \s*\'(BOUNDARY|SECTION):\'\s*\'BRANCH:\'\s*\'(.*)\'\s*\'\((.*)\)\'\s*\'(.*)\'"
+    def finalise(self):
+        raise NotImplementedError
+
+    def process_header(self, header):
+        if header.keyword == "date":
+            self.date = parser.parse(header.value, yearfirst=True)
+        elif header.keyword == "network":
+            self.network = int(header.value)
+        else:
+            setattr(self, header.keyword, header.value)
+
+    def process_branch(self, branch):
+        self.branches.append(branch)
+
+    def process_catalog(self, catalog):
+        self.catalog.append(catalog)
+
+    def _new_decoder(self, size_hint=None):
+        return TimeSeriesDecoder(self.widths(), dtype=self.dtype, size_hint=size_hint)
+
+    def widths(self):
+        raise NotImplementedError
+
+    def refresh(self, store=None):
+        """
+        Read the time steps appended to the file since it was last read (for
+        example while OLGA is still running) and add them to the arrays, and
+        to the HDF5 `store` if one is given. The store's summary statistics
+        are updated; its decimation pyramid is left as it was, so `overview`
+        reads the raw data until `build_pyramid` is run again. Returns the
+        new times.
+        """
+        if getattr(self, "_hdf5", None) is not None:
+            raise Exception("refresh needs a parsed object, not one attached to a store.")
+        if store is not None and (self.variables is not None or self.locations is not None):
+            raise Exception("Only a plot of every variable and location can refresh a store.")
+        n_before = len(self.times)
+        offset = self.offset
+        records = (
+            r for r in iter_records(self.path, offset, follow=True, select=self._select)
+            if isinstance(r, (TimeStep, TrendRows))
         )
-        self.catalog = catalog_item_re.findall(catalog_list[0][1])
-        if len(self.catalog) != catalog_length:
-            raise Exception(
-                f"Number of catalogue items ({len(self.catalog)}) does not equal value in PPL file ({int(catalog[1])})."
-            )
+        if store is not None:
+            records = self._tee_to_store(records, store)
+        self._decoder = None
+        try:
+            try:
+                for record in records:
+                    getattr(self, f"process_{type(record).__name__.lower()}")(record)
+            except _EndOfWindow:
+                records.close()
+            if self._decoder is not None:
+                self.extend()
+        except BaseException:
+            # the handlers move the offset as they go; nothing was added, so
+            # the next refresh must read the same time steps again
+            self.offset = offset
+            raise
+        finally:
+            del self._decoder
+        return self.times[n_before:]
 
-    def process_time_series_list(self, time_series_list):
-        # convert time series data to a list of floats for time value and Pandas Series' for time series data
-        time_series = [
-            np.array(r.split(), dtype=np.float)
-            if n % (len(self.catalog) + 1) > 0
-            else float(r)
-            for n, r in enumerate(time_series_list[0].split("\n")[1:])
-        ]
-        times = []
-        series = []
-        for n, v in enumerate(time_series):
-            if n % (len(self.catalog) + 1) == 0:
-                times.append(v)
+    def _tee_to_store(self, records, store):
+        with h5py.File(store, "a") as hdf5:
+            if "time" not in hdf5:
+                raise Exception(f"{store} is not an HDF5 store of this file.")
+            writer = HDF5Writer(hdf5, self.dtype)
+            writer.branches = self.branches
+            writer.catalog = self.catalog
+            try:
+                for record in records:
+                    yield record
+                    getattr(writer, f"process_{type(record).__name__.lower()}")(record)
+            finally:
+                # also when closed at the end of a time window
+                writer.flush()
+                writer._write_summary()
+
+    def follow(self, interval=1.0, callback=None, store=None, idle_timeout=None):
+        """
+        Poll the file every `interval` seconds, yielding the array of new
+        times (and calling `callback(self, times)`) whenever time steps are
+        appended. Stops after `idle_timeout` seconds without new data.
+        """
+        idle = 0.0
+        while idle_timeout is None or idle < idle_timeout:
+            times = self.refresh(store)
+            if len(times):
+                idle = 0.0
+                if callback is not None:
+                    callback(self, times)
+                yield times
             else:
-                series.append(v)
+                time.sleep(interval)
+                idle += interval
+
+    def extend(self):
+        raise NotImplementedError
+
+    def _append_rows(self, key, data, rows):
+        """
+        `data` followed by `rows`. The result is a view of a buffer that grows
+        by doubling, so repeated refreshes do not copy the whole history.
+        """
+        buffers = self.__dict__.setdefault("_buffers", {})
+        buffer = buffers.get(key)
+        used = len(data)
+        if buffer is None or not np.shares_memory(buffer[:used], data):
+            buffer = data
+        needed = used + len(rows)
+        if needed > len(buffer):
+            grown = np.empty((max(needed, 2 * used),) + data.shape[1:], data.dtype)
+            metrics.allocated("finalise", grown)
+            grown[:used] = data
+            buffer = grown
+        buffer[used:needed] = rows
+        buffers[key] = buffer
+        return buffer[:needed]
+
+    def catalog_index(self):
+        """Catalog item number for each (symbol, branch or location) pair."""
+        if getattr(self, "_catalog_index", None) is None:
+            self._catalog_index = {
+                (c.symbol, self._location(c)): n for n, c in enumerate(self.catalog)
+            }
+        return self._catalog_index
+
+    def _location(self, item):
+        raise NotImplementedError
+
+    def _item(self, symbol, location):
+        try:
+            return self.catalog[self.catalog_index()[(symbol, location)]]
+        except KeyError:
+            raise KeyError(f"No variable {symbol} at '{location}'.") from None
+
+    def index(self):
+        """The PlotIndex of the file, built or updated as needed."""
+        if getattr(self, "_index", None) is None:
+            self._index = load_index(self.path)
+        return self._index.update()
 
-        d = {
-            "times": list(
-                itertools.chain.from_iterable(
-                    itertools.repeat(x, len(self.catalog)) for x in times
+    def _row(self, n):
+        # catalog item n's row in the file, allowing for partial loading
+        rows = getattr(self, "_rows", None)
+        return n if rows is None else rows[n]
+
+    def _store(self):
+        if getattr(self, "_hdf5", None) is None:
+            raise Exception("Overviews need a plot opened lazily from an HDF5 store.")
+        return self._hdf5
+
+    def time_range(self, t0=None, t1=None):
+        """Slice of the (sorted) time axis with t0 <= time <= t1."""
+        i0 = 0 if t0 is None else int(np.searchsorted(self.times, t0, side="left"))
+        i1 = len(self.times) if t1 is None else int(np.searchsorted(self.times, t1, side="right"))
+        return slice(i0, i1)
+
+
+class PPL(OlgaPlot):
+    """
+    OLGA profile plot. Each branch holds its BOUNDARY and SECTION variables
+    as contiguous (time, node, var) arrays; catalog metadata is held once and
+    DataFrames are built only when asked for.
+    """
+
+    buffer_rows = 256
+
+    def initialise_variables(self):
+        super().initialise_variables()
+        self._time_series = None
+
+    @property
+    def time_series(self):
+        """
+        Long-format DataFrame with one row per (time, catalog item), built on
+        first access. Metadata columns are categorical and `data` holds views
+        onto the branch arrays.
+        """
+        if self._time_series is None and self.times is not None:
+            self._time_series = self.build_time_series()
+        return self._time_series
+
+    def _location(self, item):
+        return item.branch
+
+    def get(self, symbol, branch, t0=None, t1=None, x0=None, x1=None, axes=False):
+        """
+        Values of `symbol` in `branch` as a (time, position) array, restricted
+        to t0 <= time <= t1 and x0 <= position <= x1. Only the selected slice
+        is read when the data is on disk. With `axes=True` returns
+        (times, positions, values).
+        """
+        item = self._item(symbol, branch)
+        positions = self.branch(branch).positions(item.kind)
+        rows = self.time_range(t0, t1)
+        j0 = 0 if x0 is None else int(np.searchsorted(positions, x0, side="left"))
+        j1 = len(positions) if x1 is None else int(np.searchsorted(positions, x1, side="right"))
+        values = np.asarray(item.data[rows, j0:j1])
+        if axes:
+            return self.times[rows], positions[j0:j1], values
+        return values
+
+    def overview(self, symbol, branch, points, t0=None, t1=None):
+        """
+        `symbol` in `branch` from the store's decimation pyramid at no less
+        than `points` time steps between t0 and t1, e.g. for plotting a long
+        run. Returns a dict of `time` (start, end) per row, the mean
+        `position` of each node block and (time, position) `min`, `max` and
+        `mean` arrays.
+        """
+        item = self._item(symbol, branch)
+        b = self.branch(branch)
+        kind = item.kind.lower()
+        result = overview(
+            self._store(), f"branches/{branch}/{kind}", points, t0, t1,
+            getattr(b, f"{kind}_symbols").index(symbol),
+        )
+        positions = b.positions(kind)
+        starts = np.arange(0, len(positions), result["node_block"])
+        result["position"] = np.add.reduceat(positions, starts) / np.diff(np.append(starts, len(positions)))
+        return result
+
+    def interpolate(self, symbol, branch, positions, times=None, grid=True):
+        """
+        `symbol` at distances `positions` along `branch`, linearly
+        interpolated in position and time. `branch` may also be a list of
+        connected branches forming a route through the network, positions
+        then being measured from the start of the first, each branch's
+        length following on from the previous one. `times` defaults to
+        every time step; both are clamped to the range of the data.
+
+        Returns a (time, position) array, or with `grid=False` the value at
+        each (positions[i], times[i]) pair. Only the time steps spanning
+        `times` are read when the data is on disk.
+        """
+        route = [branch] if isinstance(branch, str) else list(branch)
+        positions = np.atleast_1d(np.asarray(positions, dtype=np.float64))
+        times = self.times if times is None else np.atleast_1d(np.asarray(times, dtype=np.float64))
+        if not grid and len(times) != len(positions):
+            raise Exception(f"{len(times)} times given for {len(positions)} positions.")
+        starts = np.concatenate([[0.0], np.cumsum([self.branch(b).length for b in route])])
+        on = np.clip(np.searchsorted(starts, positions, side="right") - 1, 0, len(route) - 1)
+        rows = slice(0, 0)
+        if len(times):
+            i0, _, _ = interp_weights(self.times, times.min())
+            _, i1, _ = interp_weights(self.times, times.max())
+            rows = slice(int(i0), int(i1) + 1)
+        it, jt, wt = interp_weights(self.times[rows], times)
+        result = np.empty((len(times), len(positions)) if grid else len(positions))
+        for n, name in enumerate(route):
+            mask = on == n
+            if not mask.any():
+                continue
+            item = self._item(symbol, name)
+            b = self.branch(name)
+            values = np.asarray(item.data[rows], dtype=np.float64)
+            local = positions[mask] - starts[n] + b.values[0][0]
+            ix, jx, wx = interp_weights(b.positions(item.kind), local)
+            if grid:
+                at_times = values[it] * (1 - wt[:, np.newaxis]) + values[jt] * wt[:, np.newaxis]
+                result[:, mask] = at_times[:, ix] * (1 - wx) + at_times[:, jx] * wx
+            else:
+                t, u = it[mask], jt[mask]
+                w = wt[mask]
+                result[mask] = (
+                    (values[t, ix] * (1 - wx) + values[t, jx] * wx) * (1 - w)
+                    + (values[u, ix] * (1 - wx) + values[u, jx] * wx) * w
                 )
-            ),
-            "symbol": [str(c[0]) for c in self.catalog] * len(times),
-            "kind": [c[1] for c in self.catalog] * len(times),
-            "branch": [c[2] for c in self.catalog] * len(times),
-            "units": [c[3] for c in self.catalog] * len(times),
-            "description": [c[4] for c in self.catalog] * len(times),
-            "data": series,
-        }
-        self.time_series = pd.DataFrame(data=d)
+        return result
+
+    def branch(self, name):
+        if getattr(self, "_branch_index", None) is None:
+            self._branch_index = {b.name: b for b in self.branches}
+        return self._branch_index[name]
+
+    def widths(self):
+        return catalog_widths(self.branches, self.catalog)
+
+    def process_timestep(self, time_step):
+        if not self._in_window(time_step.time):
+            self.offset = time_step.end
+            return
+        if self._decoder is None:
+            self._decoder = self._new_decoder()
+            self._start_targets()
+        self._decoder.append(time_step)
+        self.offset = time_step.end
+        if self._decoder.count == self.buffer_rows:
+            self._flush()
+
+    def read_step(self, step):
+        """
+        Values of every catalog item at time step `step` of the file, read
+        directly through the byte-offset index. Returns (time, [arrays]).
+        """
+        index = self.index()
+        rows = [self.read_row(step, n, index) for n in range(len(self.catalog))]
+        return index.times[step], rows
+
+    def read_row(self, step, item, index=None):
+        """
+        One catalog row at time step `step`, where `item` is a catalog item
+        number or a (symbol, branch) pair.
+        """
+        if index is None:
+            index = self.index()
+        if isinstance(item, tuple):
+            item = self.catalog_index()[item]
+        text = index.read(*index.line_range(step, 1 + self._row(item)))
+        return np.fromstring(text, dtype=self.dtype, sep=" ")
+
+    def _flush(self):
+        # scatter the buffered rows into per-branch chunks so the flat rows
+        # never accumulate for the whole file
+        if self._decoder.count == 0:
+            return
+        values = self._decoder.values
+        with metrics.stage("scatter", values.nbytes):
+            self._times.append(self._decoder.times.copy())
+            for _, _, _, idx, chunks in self._targets:
+                chunks.append(values[:, idx])
+                metrics.allocated("scatter", chunks[-1])
+        self._decoder.clear()
+
+    def _start_targets(self):
+        self._targets = [
+            (branch, kind.lower(), items, idx, [])
+            for branch, kind, items, idx in branch_targets(
+                self.branches, self.catalog, self._decoder.offsets[:-1]
+            )
+        ]
+        self._times = []
+
+    def finalise(self):
+        if not hasattr(self, "_targets"):
+            self._start_targets()
+        self._flush()
+        self.times = np.concatenate(self._times) if self._times else np.empty(0)
+        for branch, kind, items, idx, chunks in self._targets:
+            data = np.concatenate(chunks) if chunks else np.empty((0,) + idx.shape, self.dtype)
+            chunks.clear()
+            setattr(branch, kind, data)
+            setattr(branch, f"{kind}_symbols", [self.catalog[n].symbol for n in items])
+        del self._targets, self._times
+        self.link_catalog()
+
+    def extend(self):
+        self._flush()
+        self.times = self._append_rows("time", self.times, np.concatenate(self._times))
+        for branch, kind, _, _, chunks in self._targets:
+            data = self._append_rows((branch.name, kind), getattr(branch, kind), np.concatenate(chunks))
+            setattr(branch, kind, data)
+        del self._targets, self._times
+        self._time_series = None
+        self.link_catalog()
+
+    def set_time_series(self, times, values):
+        self.times = times.copy()
+        offsets = np.concatenate([[0], np.cumsum(self.widths(), dtype=np.int64)])[:-1]
+        for branch, kind, items, idx in branch_targets(self.branches, self.catalog, offsets):
+            setattr(branch, kind.lower(), values[:, idx])
+            setattr(branch, f"{kind.lower()}_symbols", [self.catalog[n].symbol for n in items])
+        self._time_series = None
+        self.link_catalog()
+
+    def link_catalog(self):
+        for c in self.catalog:
+            c.data = self.branch(c.branch)[c.symbol]
+
+    def attach(self):
+        for branch in self.branches:
+            group = self._hdf5["branches"][branch.name]
+            for kind in ["boundary", "section"]:
+                if kind in group:
+                    setattr(branch, kind, group[kind])
+                    setattr(branch, f"{kind}_symbols", list(group[kind].attrs["symbols"]))
+        self.link_catalog()
+
+    def read_all(self):
+        for branch in self.branches:
+            for kind in ["boundary", "section"]:
+                if getattr(branch, kind) is not None:
+                    setattr(branch, kind, getattr(branch, kind)[...])
+        self.link_catalog()
+        self.close()
+
+    def catalog_frame(self):
+        """The catalog as a DataFrame with categorical columns."""
+        return pd.DataFrame(
+            {
+                f: pd.Categorical([getattr(c, f) for c in self.catalog])
+                for f in ["symbol", "kind", "branch", "units", "description"]
+            }
+        )
+
+    def branch_frame(self, name, kind="BOUNDARY"):
+        """
+        The `kind` variables of branch `name` as a DataFrame indexed by
+        (time, position) with one column per symbol.
+        """
+        branch = self.branch(name)
+        data = np.asarray(getattr(branch, kind.lower())[...])
+        positions = branch.positions(kind)
+        index = pd.MultiIndex.from_product(
+            [self.times, positions], names=["time", "position"]
+        )
+        return pd.DataFrame(
+            data.reshape(-1, data.shape[-1]),
+            index=index,
+            columns=getattr(branch, f"{kind.lower()}_symbols"),
+        )
+
+    def build_time_series(self):
+        with metrics.stage("frame"):
+            return self._build_time_series()
+
+    def _build_time_series(self):
+        n_times = len(self.times)
+        catalog = self.catalog_frame()
+        codes = np.tile(np.arange(len(self.catalog)), n_times)
+        d = {"times": np.repeat(self.times, len(self.catalog))}
+        for f in catalog.columns:
+            d[f] = catalog[f].take(codes).reset_index(drop=True)
+        d["data"] = [c.data[n] for n in range(n_times) for c in self.catalog]
+        return pd.DataFrame(data=d)
+
+
+class TPL(OlgaPlot):
+    """
+    OLGA trend plot: every catalog item is one column of a (n_times, n_vars)
+    array, located through the (symbol, kind, location) column index.
+    """
+
+    def initialise_variables(self):
+        super().initialise_variables()
+        self.columns = None
+
+    def widths(self):
+        return [1] * len(self.catalog)
+
+    def process_trend(self, trend):
+        self.catalog.append(trend)
+
+    def process_trendrows(self, trend_rows):
+        if self._decoder is None:
+            self._decoder = self._new_decoder()
+        self._decoder.extend(trend_rows, self._rows, self.t_start, self.t_end)
+        self.offset = trend_rows.end
+        if self.t_end is not None and self._decoder.count and self._decoder.times[-1] >= self.t_end:
+            raise _EndOfWindow
+
+    def read_step(self, step):
+        """
+        The trend row of time step `step` of the file, read directly through
+        the byte-offset index. Returns (time, values).
+        """
+        index = self.index()
+        row = np.fromstring(index.read(*index.step_range(step)), dtype=np.float64, sep=" ")
+        rows = getattr(self, "_rows", None)
+        values = row[1:] if rows is None else row[1:][rows]
+        return row[0], values.astype(self.dtype)
+
+    def _new_decoder(self):
+        if self.times is not None:
+            return super()._new_decoder()
+        return super()._new_decoder(size_hint=os.path.getsize(self.path))
+
+    def finalise(self):
+        self.times = self._decoder.times
+        self.values = self._decoder.values
+        for n, c in enumerate(self.catalog):
+            c.data = self.values[:, n]
+        self.build_columns()
+
+    def set_time_series(self, times, values):
+        self.times = times.copy()
+        self.values = values.copy()
+        for n, c in enumerate(self.catalog):
+            c.data = self.values[:, n]
+
+    def extend(self):
+        self.times = self._append_rows("time", self.times, self._decoder.times)
+        self.values = self._append_rows("values", self.values, self._decoder.values)
+        for n, c in enumerate(self.catalog):
+            c.data = self.values[:, n]
+
+    def attach(self):
+        trends = self._hdf5["trends"]
+        for n, c in enumerate(self.catalog):
+            c.data = LazyVariable(trends, n)
+        self.build_columns()
+
+    def read_all(self):
+        self.values = self._hdf5["trends"][...]
+        for n, c in enumerate(self.catalog):
+            c.data = self.values[:, n]
+        self.close()
+
+    def build_columns(self):
+        self.columns = pd.MultiIndex.from_tuples(
+            [(c.symbol, c.kind, c.location) for c in self.catalog],
+            names=["symbol", "kind", "location"],
+        )
+
+    def _location(self, item):
+        return item.location
+
+    def column(self, symbol, location=""):
+        """Column number of the trend `symbol` at `location`."""
+        try:
+            return self.catalog_index()[(symbol, location)]
+        except KeyError:
+            raise KeyError(f"No trend {symbol} at '{location}'.") from None
+
+    def get(self, symbol, location="", t0=None, t1=None, axes=False):
+        """
+        Values of the trend `symbol` at `location` with t0 <= time <= t1.
+        With `axes=True` returns (times, values).
+        """
+        rows = self.time_range(t0, t1)
+        values = np.asarray(self._item(symbol, location).data[rows])
+        if axes:
+            return self.times[rows], values
+        return values
+
+    def overview(self, symbol, location, points, t0=None, t1=None):
+        """
+        The trend `symbol` at `location` from the store's decimation pyramid
+        at no less than `points` time steps between t0 and t1. Returns a dict
+        of `time` (start, end) per row and `min`, `max` and `mean` arrays.
+        """
+        return overview(self._store(), "trends", points, t0, t1, self.column(symbol, location))
+
+    def to_frame(self):
+        return pd.DataFrame(
+            self.values, index=pd.Index(self.times, name="time"), columns=self.columns
+        )
+
+
+def _header_records(records):
+    # the records before the TIME SERIES
+    for record in records:
+        if isinstance(record, (TimeStep, TrendRows)):
+            records.close()
+            return
+        yield record
+
+
+class _EndOfWindow(Exception):
+    """Raised by a plot's record handlers once past the requested t_end."""
+
+
+@dataclass
+class Header:
+
+    keyword: str
+    value: str
 
 
 @dataclass
@@ -238,6 +1776,70 @@ class Branch:
     name: str
     count: int
     values: List[np.ndarray] = field(default_factory=list)
+    boundary: np.ndarray = None
+    section: np.ndarray = None
+    boundary_symbols: List[str] = field(default_factory=list)
+    section_symbols: List[str] = field(default_factory=list)
+    _positions: dict = field(default_factory=dict, repr=False, compare=False)
+
+    def positions(self, kind):
+        """
+        Distance along the branch of each value of a `kind` variable: the
+        nodes for BOUNDARY variables and section midpoints for SECTION ones.
+        Computed once per kind.
+        """
+        kind = kind.upper()
+        if kind not in self._positions:
+            length = np.asarray(self.values[0], dtype=np.float64)
+            self._positions[kind] = length if kind == "BOUNDARY" else (length[:-1] + length[1:]) / 2
+        return self._positions[kind]
+
+    @property
+    def length(self):
+        return float(self.values[0][-1] - self.values[0][0])
+
+    def __getitem__(self, symbol):
+        """(time, node) values of `symbol`, a view if the data is in memory."""
+        for kind in ["boundary", "section"]:
+            symbols = getattr(self, f"{kind}_symbols")
+            if symbol in symbols:
+                data = getattr(self, kind)
+                if isinstance(data, np.ndarray):
+                    return data[:, :, symbols.index(symbol)]
+                return LazyVariable(data, symbols.index(symbol))
+        raise KeyError(f"No variable {symbol} in branch {self.name}.")
+
+
+class LazyVariable:
+    """
+    One variable (the last axis) of an on-disk dataset. Indexing reads just
+    the requested slice; np.asarray reads it all.
+    """
+
+    def __init__(self, dataset, column):
+        self.dataset = dataset
+        self.column = column
+
+    @property
+    def shape(self):
+        return self.dataset.shape[:-1]
+
+    def __len__(self):
+        return self.shape[0]
+
+    def __getitem__(self, key):
+        if not isinstance(key, tuple):
+            key = (key,)
+        if any(k is Ellipsis for k in key):
+            n = key.index(Ellipsis)
+            rest = tuple(k for k in key[n + 1:] if k is not Ellipsis)
+            key = key[:n] + (slice(None),) * (len(self.shape) - n - len(rest)) + rest
+        key = key + (slice(None),) * (len(self.shape) - len(key))
+        return self.dataset[key + (self.column,)]
+
+    def __array__(self, dtype=None, copy=None):
+        data = self[...]
+        return data if dtype is None else data.astype(dtype)
 
 
 @dataclass
@@ -248,18 +1850,107 @@ class Catalog:
     branch: str
     units: str
     description: str
-    data: np.ndarray
+    data: np.ndarray = None
 
 
-def open_PPL(path):
-    ppl = PPL(path)
-    ppl.parse()
+@dataclass
+class Trend:
+
+    symbol: str
+    kind: str
+    location: str
+    units: str
+    description: str
+    data: np.ndarray = None
+
+
+@dataclass
+class TimeStep:
+
+    time: float
+    block: str = ""
+    end: int = 0
+
+
+@dataclass
+class TrendRows:
+
+    rows: int
+    block: str = ""
+    end: int = 0
+
+
+def open_PPL(
+    path,
+    dtype=np.float64,
+    lazy=False,
+    cache=None,
+    follow=False,
+    variables=None,
+    branches=None,
+    t_start=None,
+    t_end=None,
+    header_only=False,
+    parallel=None,
+):
+    """
+    Read a .ppl file.
+
+    With a `cache` (a Cache or a cache directory) the file is parsed once into
+    the cache and later opens load the converted store instead. With
+    `lazy=True` (which uses the default Cache unless one is given) variables
+    are read from the store only when indexed. With `follow=True` a file that
+    OLGA is still writing is read up to its last complete time step, ready
+    for PPL.refresh() / PPL.follow().
+
+    When parsing, `variables` and `branches` restrict the catalog to those
+    symbols and branches (other rows are not decoded), and only time steps
+    with t_start <= time <= t_end are kept, reading stopping after t_end.
+    With `header_only=True` only the header, branches and catalog are read;
+    time steps can then be read one at a time with read_step() / read_row()
+    through the byte-offset index. With `parallel=True` (or a number of
+    worker processes) the time series is decoded by a process pool, see
+    OlgaPlot.parse_parallel.
+    """
+    ppl = PPL(path, dtype, variables, branches, t_start, t_end)
+    _open(ppl, dtype, lazy, cache, follow, header_only, parallel)
     return ppl
 
 
-if __name__ == "__main__":
-    from pathlib import Path
+def open_TPL(
+    path,
+    dtype=np.float64,
+    lazy=False,
+    cache=None,
+    follow=False,
+    variables=None,
+    locations=None,
+    t_start=None,
+    t_end=None,
+    header_only=False,
+    parallel=None,
+):
+    tpl = TPL(path, dtype, variables, locations, t_start, t_end)
+    _open(tpl, dtype, lazy, cache, follow, header_only, parallel)
+    return tpl
+
+
+def _open(plot, dtype, lazy, cache, follow=False, header_only=False, parallel=None):
+    if parallel and (follow or header_only or lazy or cache is not None):
+        raise Exception("Parallel parsing reads a complete file without a cache.")
+    if parallel:
+        plot.parse_parallel(None if parallel is True else parallel)
+        return
+    if cache is None and not lazy:
+        plot.parse(follow, header_only)
+        return
+    if any(v is not None for v in [plot.variables, plot.locations, plot.t_start, plot.t_end]):
+        raise Exception(
+            "Partial loading applies when parsing; query a cached or lazy store with get() instead."
+        )
+    if not isinstance(cache, Cache):
+        cache = Cache(cache)
+    plot.load_hdf5(cache.get(plot.path, dtype))
+    if not lazy:
+        plot.read_all()
 
-    ppl_file_path = "tests\\test_files\\AP_Lean_Fluid_Slugtracking_35MMscfd_60bara.ppl"
-    ppl = store_ppl_in_hdf5(ppl_file_path)
-    print(ppl)
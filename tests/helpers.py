@@ -0,0 +1,33 @@
+from pathlib import Path
+
+import h5py
+import numpy as np
+
+from src.pyramid import time_series_datasets
+
+test_files = Path(__file__).parent / "test_files"
+ppl_files = ["FC1_rev01.ppl", "32in_Peak_Cond_1200MMscfd.ppl"]
+
+
+def reference_time_series(path, widths):
+    """(times, values) split from every number after TIME SERIES."""
+    text = Path(path).read_text()
+    numbers = np.array(text[text.index("TIME SERIES"):].split("\n", 1)[1].split(), dtype=np.float64)
+    rows = numbers.reshape(-1, 1 + sum(widths))
+    return rows[:, 0], rows[:, 1:]
+
+
+def truncated_copy(source, destination, fraction):
+    """Copy `fraction` of `source`, cut mid-line as a running OLGA leaves it."""
+    data = Path(source).read_bytes()
+    Path(destination).write_bytes(data[: int(len(data) * fraction)])
+    return data
+
+
+def assert_stores_equal(a, b):
+    with h5py.File(a, "r") as a, h5py.File(b, "r") as b:
+        np.testing.assert_array_equal(a["time"][...], b["time"][...])
+        for name in time_series_datasets(b):
+            np.testing.assert_array_equal(a[name][...], b[name][...])
+        for statistic in b.get("summary", {}):
+            np.testing.assert_allclose(a["summary"][statistic][...], b["summary"][statistic][...], equal_nan=True)
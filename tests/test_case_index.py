@@ -0,0 +1,64 @@
+import shutil
+
+import h5py
+import numpy as np
+
+from src.cli import main
+from src.stu_flo import Cache, open_PPL, open_TPL
+from tests.helpers import test_files
+
+
+def brute_force_summary(plot, c):
+    """The summary statistics of catalog item `c`, one value at a time."""
+    data = np.asarray(c.data, dtype=np.float64).reshape(len(plot.times), -1)
+    x = plot.branch(c.branch).positions(plot._item(c.symbol, c.branch).kind) if hasattr(c, "branch") else None
+    stats = {"min": np.inf, "max": -np.inf, "count": data.size, "mean": data.sum() / data.size}
+    for i in range(data.shape[0]):
+        for j in range(data.shape[1]):
+            for statistic, better in [("min", np.less), ("max", np.greater)]:
+                if better(data[i, j], stats[statistic]):
+                    stats[statistic] = data[i, j]
+                    stats[f"time_{statistic}"] = plot.times[i]
+                    stats[f"position_{statistic}"] = np.nan if x is None else x[j]
+    stats["final"] = data[-1].mean()
+    return stats
+
+
+def test_summary_statistics_match_brute_force(tmp_path):
+    cache = Cache(tmp_path / "cache")
+    for name, opener in [("FC1_rev01.ppl", open_PPL), ("FC1_rev01.tpl", open_TPL)]:
+        plot = opener(test_files / name)
+        with h5py.File(cache.get(test_files / name), "r") as hdf5:
+            summary = {s: hdf5["summary"][s][...] for s in hdf5["summary"]}
+        for n, c in enumerate(plot.catalog):
+            for statistic, value in brute_force_summary(plot, c).items():
+                np.testing.assert_allclose(summary[statistic][n], value, rtol=1e-12, equal_nan=True)
+
+
+def test_screen_finds_cases_by_statistic(tmp_path, capsys):
+    cache = Cache(tmp_path / "cache")
+    for name in ["a", "b"]:
+        shutil.copy(test_files / "FC1_rev01.ppl", tmp_path / f"{name}.ppl")
+    shutil.copy(test_files / "32in_Peak_Cond_1200MMscfd.ppl", tmp_path / "c.ppl")
+    plots = {}
+    for name in ["a", "b", "c"]:
+        cache.get(tmp_path / f"{name}.ppl")
+        plots[str((tmp_path / f"{name}.ppl").resolve())] = open_PPL(tmp_path / f"{name}.ppl")
+
+    with cache.index() as index:
+        for statistic, comparison, threshold in [("max", ">", 1.3e7), ("min", "<=", 9.5e6), ("mean", ">=", 1.2e7)]:
+            reduce = {"max": np.max, "min": np.min, "mean": np.mean}[statistic]
+            compare = {">": np.greater, "<=": np.less_equal, ">=": np.greater_equal}[comparison]
+            expected = [
+                (path, c.branch, reduce(c.data))
+                for path, plot in sorted(plots.items())
+                for c in plot.catalog
+                if c.symbol == "PT" and compare(reduce(c.data), threshold)
+            ]
+            rows = index.screen("PT", statistic, comparison, threshold)
+            assert [(p, loc) for p, loc, _ in rows] == [(p, loc) for p, loc, _ in expected]
+            np.testing.assert_allclose([v for *_, v in rows], [v for *_, v in expected], rtol=1e-12)
+        assert [p for p, *_ in index.screen("PT", "max", ">", 0.0, location="riser")] == sorted(plots)[:2]
+
+    assert main(["screen", "PT", "max", ">", "0", "--location", "riser", "--out", str(tmp_path / "cache")]) == 0
+    assert capsys.readouterr().out.splitlines()[-1] == "2 matches"
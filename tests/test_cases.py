@@ -0,0 +1,52 @@
+import numpy as np
+
+from benchmarks.synthetic import write_ppl
+from src.cases import CaseSet
+from src.stu_flo import PlotIndex, open_PPL, open_TPL
+from tests.helpers import test_files
+
+
+def bilinear(ppl, symbol, branch, times, positions):
+    item = ppl._item(symbol, branch)
+    x = ppl.branch(branch).positions(item.kind)
+    along_x = np.array([np.interp(positions, x, row) for row in item.data])
+    return np.array([np.interp(times, ppl.times, column) for column in along_x.T]).T
+
+
+def test_profiles_on_differing_grids(tmp_path):
+    paths = [
+        write_ppl(tmp_path / "a.ppl", branches=1, nodes=40, variables=4, times=12, seed=1),
+        write_ppl(tmp_path / "b.ppl", branches=1, nodes=55, variables=4, times=9, seed=2),
+    ]
+    with CaseSet(paths, cache=tmp_path / "cache") as cases:
+        times, positions, values = cases.profiles("PT", "branch_0")
+        a = open_PPL(paths[0])
+        np.testing.assert_array_equal(times, a.times[:9])
+        np.testing.assert_array_equal(positions, a.branch("branch_0").positions("SECTION"))
+        np.testing.assert_array_equal(values[0], a.branch("branch_0")["PT"][:9])
+
+        times, positions = np.array([30.0, 95.5, 200.0]), np.array([60.0, 333.3, 1900.0])
+        _, _, values = cases.profiles("PT", "branch_0", times, positions)
+        for n, path in enumerate(paths):
+            np.testing.assert_allclose(values[n], bilinear(open_PPL(path), "PT", "branch_0", times, positions))
+
+        envelope = CaseSet.envelope(values, percentiles=(50,))
+        np.testing.assert_array_equal(envelope["max"], np.maximum(values[0], values[1]))
+        np.testing.assert_allclose(envelope[50], values.mean(axis=0))
+
+
+def test_trends_on_the_common_time_range(tmp_path):
+    # a shorter run of the same case, cut after a whole time step
+    index = PlotIndex(test_files / "FC1_rev01.tpl").build()
+    data = (test_files / "FC1_rev01.tpl").read_bytes()
+    (tmp_path / "short.tpl").write_bytes(data[: index.lines[len(index) // 2]])
+    paths = [test_files / "FC1_rev01.tpl", tmp_path / "short.tpl"]
+    full, short = open_TPL(paths[0]), open_TPL(paths[1])
+    c = full.catalog[7]
+    with CaseSet(paths, cache=tmp_path / "cache") as cases:
+        times, values = cases.trends(c.symbol, c.location)
+        assert 0 < len(times) < len(full.times)
+        np.testing.assert_array_equal(times, full.times[: len(short.times)])
+        np.testing.assert_array_equal(values[0], values[1])
+        times, values = cases.trends(c.symbol, c.location, times=np.array([90.0, 1000.0]))
+        np.testing.assert_allclose(values[0], np.interp([90.0, 1000.0], full.times, c.data))
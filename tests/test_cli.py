@@ -0,0 +1,23 @@
+import shutil
+
+from src.cli import main
+from src.stu_flo import Cache
+from tests.helpers import test_files
+
+
+def test_convert_skips_cached_files_and_survives_a_bad_file(tmp_path, capsys):
+    for name in ["FC1_rev01.ppl", "FC1_rev01.tpl"]:
+        shutil.copy(test_files / name, tmp_path / name)
+    (tmp_path / "bad.ppl").write_text("'OLGA 7.2.2.0'\nPROFILE PLOT\nNETWORK\n1\nnot a plot\n")
+    cache = tmp_path / "cache"
+
+    assert main(["convert", str(tmp_path / "*.?pl"), "--out", str(cache), "--jobs", "2"]) == 1
+    out = capsys.readouterr()
+    assert "2 converted, 1 failed" in out.out
+    assert "bad.ppl" in out.err
+    assert Cache(cache).contains(tmp_path / "FC1_rev01.ppl") and Cache(cache).contains(tmp_path / "FC1_rev01.tpl")
+
+    (tmp_path / "bad.ppl").unlink()
+    assert main(["convert", str(tmp_path / "*.?pl"), "--out", str(cache)]) == 0
+    out = capsys.readouterr().out
+    assert out.count("skipped") == 2 and "0 converted, 0 failed" in out
@@ -0,0 +1,30 @@
+import h5py
+import numpy as np
+import pytest
+
+from src.stu_flo import open_PPL, store_ppl_in_hdf5, verify_precision
+from tests.helpers import test_files
+
+
+@pytest.mark.parametrize("compression, filter", [("gzip", "gzip"), ("lzf", "lzf"), ("none", None)])
+def test_compression_applies_to_every_dataset(tmp_path, compression, filter):
+    store = store_ppl_in_hdf5(test_files / "FC1_rev01.ppl", tmp_path / "store.h5", compression=compression)
+    with h5py.File(store, "r") as hdf5:
+        assert hdf5.attrs["compression"] == compression
+        for name in ["branches/old_offshore/geometry", "branches/old_offshore/section", "time"]:
+            assert hdf5[name].compression == filter
+        geometry = hdf5["branches/old_offshore/geometry"][...]
+    length = open_PPL(test_files / "FC1_rev01.ppl").branch("old_offshore").values[0]
+    np.testing.assert_array_equal(geometry[:, 0], length)
+
+
+@pytest.mark.parametrize("name", ["FC1_rev01.ppl", "FC1_rev01.tpl"])
+def test_float32_keeps_the_printed_digits(tmp_path, name):
+    store = store_ppl_in_hdf5(test_files / name, tmp_path / "store.h5", dtype=np.float32)
+    assert verify_precision(test_files / name, store) <= 0.5
+    with h5py.File(store, "a") as hdf5:
+        dataset = hdf5["trends"] if "trends" in hdf5 else hdf5["branches/old_offshore/section"]
+        row = dataset[3]
+        row[...] = row * 1.0001 + 1.0
+        dataset[3] = row
+    assert verify_precision(test_files / name, store) > 0.5
@@ -0,0 +1,72 @@
+import os
+import shutil
+
+import h5py
+import numpy as np
+import pytest
+
+from src.derived import Derived
+from src.stu_flo import open_PPL
+from tests.helpers import test_files
+
+branch = "old_offshore"
+
+
+@pytest.fixture(scope="module")
+def ppl():
+    return open_PPL(test_files / "FC1_rev01.ppl")
+
+
+def test_integrals_and_differences(ppl):
+    derived = Derived(ppl)
+    length = ppl.branch(branch).values[0]
+    hol = ppl.branch(branch)["HOL"]
+    expected = [
+        sum(2.0 * hol[t, j] * (length[j + 1] - length[j]) for j in range(len(length) - 1))
+        for t in range(len(ppl.times))
+    ]
+    np.testing.assert_allclose(derived.liquid_inventory(branch, 2.0), expected)
+    gt = ppl.branch(branch)["GT"]
+    expected = [
+        sum((gt[t, j] + gt[t, j + 1]) / 2 * (length[j + 1] - length[j]) for j in range(len(length) - 1))
+        for t in range(len(ppl.times))
+    ]
+    np.testing.assert_allclose(derived.integral("GT", branch), expected)
+    pt = ppl.branch(branch)["PT"]
+    np.testing.assert_array_equal(derived.pressure_drop(branch), pt[:, 0] - pt[:, -1])
+
+
+def test_derivatives_rolling_and_extremes(ppl):
+    derived = Derived(ppl)
+    pt = ppl.branch(branch)["PT"]
+    positions = ppl.branch(branch).positions("SECTION")
+    np.testing.assert_allclose(derived.gradient("PT", branch), [np.gradient(row, positions) for row in pt])
+    expected = np.transpose([np.gradient(column, ppl.times) for column in pt.T])
+    np.testing.assert_allclose(derived.time_derivative("PT", branch), expected)
+    window = 3
+    for statistic in ["mean", "max", "std"]:
+        expected = [getattr(np, statistic)(pt[t : t + window], axis=0) for t in range(len(ppl.times) - window + 1)]
+        np.testing.assert_allclose(derived.rolling("PT", branch, window, statistic), expected)
+    extremes = derived.extremes("PT", branch)
+    for j in [0, 100, pt.shape[1] - 1]:
+        column = pt[:, j]
+        assert extremes[0, j] == column.max() and extremes[1, j] == ppl.times[column.argmax()]
+        assert extremes[2, j] == column.min() and extremes[3, j] == ppl.times[column.argmin()]
+
+
+def test_stored_results_are_keyed_on_the_source(tmp_path):
+    source = tmp_path / "FC1_rev01.ppl"
+    shutil.copy(test_files / "FC1_rev01.ppl", source)
+    store = tmp_path / "derived.h5"
+    first = Derived(open_PPL(source), store=store).pressure_drop(branch)
+    with h5py.File(store, "a") as hdf5:
+        # mark the stored result so reading it back is visible
+        hdf5[f"derived/{branch}/difference_PT"][...] = -1.0
+    assert (Derived(open_PPL(source), store=store).pressure_drop(branch) == -1.0).all()
+
+    os.utime(source, ns=(1, 10 ** 18))
+    np.testing.assert_array_equal(Derived(open_PPL(source), store=store).pressure_drop(branch), first)
+
+    with open_PPL(source, lazy=True, cache=tmp_path / "cache") as lazy:
+        with pytest.raises(Exception, match="read-only store"):
+            Derived(lazy, store=lazy._hdf5.filename)
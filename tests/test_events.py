@@ -0,0 +1,66 @@
+import numpy as np
+
+from src.events import Rule, comparisons, scan, scan_file
+from src.stu_flo import open_PPL, open_TPL
+from tests.helpers import test_files
+
+
+def brute_force(times, values, positions, rule):
+    """(start, end, x0, x1, peak, peak_time, peak_position) of each event, one cell at a time."""
+    sign = 1.0 if rule.comparison in [">", ">="] else -1.0
+    values = values.reshape(len(times), -1)
+    events, run = [], None
+    for i, t in enumerate(times):
+        hits = [j for j in range(values.shape[1]) if comparisons[rule.comparison](values[i, j], rule.threshold)]
+        if hits and run is None:
+            run = {"start": t, "columns": set(), "peak": -np.inf}
+        if hits:
+            run["end"] = t
+            run["columns"].update(hits)
+            for j in hits:
+                if sign * values[i, j] > run["peak"]:
+                    run.update(peak=sign * values[i, j], peak_time=t, peak_column=j)
+        if run is not None and (not hits or i == len(times) - 1):
+            if run["end"] - run["start"] >= rule.min_duration:
+                x = positions if positions is not None else [None] * values.shape[1]
+                c0, c1 = min(run["columns"]), max(run["columns"])
+                peak = (sign * run["peak"], run["peak_time"], x[run["peak_column"]])
+                events.append((run["start"], run["end"], x[c0], x[c1], *peak))
+            run = None
+    return events
+
+
+def as_tuples(events):
+    return [(e.start, e.end, e.x0, e.x1, e.peak, e.peak_time, e.peak_position) for e in events]
+
+
+def test_events_across_blocks_match_brute_force():
+    tpl = open_TPL(test_files / "FC1_rev01.tpl")
+    rules = []
+    for c in tpl.catalog[:6]:
+        median = float(np.median(c.data))
+        rules += [Rule(c.symbol, c.location, ">", median), Rule(c.symbol, c.location, "<=", median, min_duration=300.0)]
+    expected = []
+    for rule in rules:
+        expected += brute_force(tpl.times, tpl.get(rule.symbol, rule.branch), None, rule)
+    # events open across a block boundary are carried into the next block
+    block = lambda t: int(np.searchsorted(tpl.times, t)) // 7
+    assert any(block(start) != block(end) for start, end, *_ in expected)
+    assert as_tuples(scan(tpl, rules, block_rows=7)) == expected
+    assert as_tuples(scan_file(test_files / "FC1_rev01.tpl", rules, block_rows=7)) == expected
+
+    ppl = open_PPL(test_files / "FC1_rev01.ppl")
+    rules = []
+    for symbol, branch in [("PT", "old_offshore"), ("GG", "riser"), ("HOL", "new_offshore")]:
+        data = ppl._item(symbol, branch).data
+        rules += [
+            Rule(symbol, branch, ">=", float(np.percentile(data, 60))),
+            Rule(symbol, branch, "<", float(np.percentile(data, 5))),
+        ]
+    expected = []
+    for rule in rules:
+        item = ppl._item(rule.symbol, rule.branch)
+        expected += brute_force(ppl.times, item.data, ppl.branch(rule.branch).positions(item.kind), rule)
+    assert expected
+    assert as_tuples(scan(ppl, rules, block_rows=2)) == expected
+    assert as_tuples(scan_file(test_files / "FC1_rev01.ppl", rules, block_rows=1)) == expected
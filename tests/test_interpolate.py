@@ -0,0 +1,32 @@
+import numpy as np
+
+from src.stu_flo import open_PPL
+from tests.helpers import test_files
+
+
+def brute_force(ppl, symbol, route, position, time):
+    for name in route:
+        b = ppl.branch(name)
+        if position < b.length or name == route[-1]:
+            break
+        position -= b.length
+    item = ppl._item(symbol, name)
+    at_position = [np.interp(position, b.positions(item.kind), row) for row in item.data]
+    return np.interp(time, ppl.times, at_position)
+
+
+def test_interpolate_along_a_route(tmp_path):
+    route = ["old_offshore", "riser", "tiein_spool"]
+    rng = np.random.default_rng(4)
+    positions = np.concatenate([rng.uniform(-100.0, 83000.0, 40), [0.0, 82155.073, 82200.0, 82300.0, 1e6]])
+    times = rng.uniform(-1000.0, 190000.0, len(positions))
+    for lazy in [False, True]:
+        ppl = open_PPL(test_files / "FC1_rev01.ppl", lazy=lazy, cache=tmp_path if lazy else None)
+        for symbol in ["PT", "GG"]:
+            pairs = ppl.interpolate(symbol, route, positions, times, grid=False)
+            expected = [brute_force(ppl, symbol, route, x, t) for x, t in zip(positions, times)]
+            np.testing.assert_allclose(pairs, expected, rtol=1e-12)
+            grid = ppl.interpolate(symbol, route, positions, times[:5])
+            expected = [[brute_force(ppl, symbol, route, x, t) for x in positions] for t in times[:5]]
+            np.testing.assert_allclose(grid, expected, rtol=1e-12)
+        ppl.close()
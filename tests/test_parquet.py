@@ -0,0 +1,46 @@
+import numpy as np
+import pytest
+
+pytest.importorskip("pyarrow")
+import pyarrow.dataset as ds  # noqa: E402
+import pyarrow.parquet as pq  # noqa: E402
+
+from src.parquet import export_parquet  # noqa: E402
+from src.stu_flo import open_PPL, open_TPL  # noqa: E402
+from tests.helpers import test_files, truncated_copy  # noqa: E402
+
+
+def test_profile_round_trip(tmp_path):
+    paths = export_parquet(test_files / "FC1_rev01.ppl", tmp_path, buffer_rows=4)
+    ppl = open_PPL(test_files / "FC1_rev01.ppl")
+    path = tmp_path / "profiles" / "case=FC1_rev01" / "branch=old_offshore" / "kind=section"
+    table = ds.dataset(path).to_table()
+    section = ppl.branch("old_offshore").positions("SECTION")
+    assert table.num_rows == len(ppl.times) * len(section)
+    np.testing.assert_array_equal(table["time"].to_numpy(), np.repeat(ppl.times, len(section)))
+    np.testing.assert_array_equal(table["position"].to_numpy(), np.tile(section, len(ppl.times)))
+    np.testing.assert_array_equal(table["PT"].to_numpy(), ppl.branch("old_offshore")["PT"].ravel())
+    schema = pq.read_schema(paths[0])
+    assert schema.metadata[b"title"] == b"mytitle"
+    assert [pq.ParquetFile(p).metadata.num_row_groups for p in paths] == [2] * len(paths)
+
+
+def test_trend_round_trip_in_row_groups_of_buffer_rows(tmp_path):
+    (path,) = export_parquet(test_files / "FC1_rev01.tpl", tmp_path, case="fc1", buffer_rows=100)
+    assert path == tmp_path / "trends" / "case=fc1" / "data.parquet"
+    tpl = open_TPL(test_files / "FC1_rev01.tpl")
+    table = pq.read_table(path)
+    np.testing.assert_array_equal(table["time"].to_numpy(), tpl.times)
+    c = tpl.catalog[3]
+    np.testing.assert_array_equal(table[f"{c.symbol}:{c.location}"].to_numpy(), c.data)
+    assert table.schema.field(f"{c.symbol}:{c.location}").metadata[b"units"] == c.units.encode()
+    metadata = pq.ParquetFile(path).metadata
+    assert [metadata.row_group(i).num_rows for i in range(metadata.num_row_groups)] == [100] * 30 + [1]
+
+
+def test_failed_export_leaves_no_files(tmp_path):
+    source = tmp_path / "FC1_rev01.ppl"
+    truncated_copy(test_files / "FC1_rev01.ppl", source, 0.6)
+    with pytest.raises(Exception):
+        export_parquet(source, tmp_path / "out", buffer_rows=1)
+    assert [p for p in (tmp_path / "out").rglob("*") if p.is_file()] == []
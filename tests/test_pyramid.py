@@ -0,0 +1,72 @@
+import h5py
+import numpy as np
+
+from src.pyramid import build_pyramid, is_current, overview
+from src.stu_flo import open_TPL, store_ppl_in_hdf5
+from tests.helpers import test_files, truncated_copy
+
+
+def assert_level_matches_blocks(raw, times, group):
+    # every value of a level is the min/max/mean of its block of raw values
+    time_block, node_block = int(group.attrs["time_block"]), int(group.attrs["node_block"])
+    for i in range(group["time"].shape[0]):
+        rows = slice(i * time_block, (i + 1) * time_block)
+        assert tuple(group["time"][i]) == (times[rows][0], times[rows][-1])
+        for j in range(group["mean"].shape[1] if raw.ndim == 3 else 1):
+            block = raw[rows, j * node_block : (j + 1) * node_block] if raw.ndim == 3 else raw[rows]
+            row = (i, j) if raw.ndim == 3 else (i,)
+            np.testing.assert_allclose(group["min"][row], block.min(axis=tuple(range(block.ndim - 1))))
+            np.testing.assert_allclose(group["max"][row], block.max(axis=tuple(range(block.ndim - 1))))
+            np.testing.assert_allclose(group["mean"][row], block.mean(axis=tuple(range(block.ndim - 1))))
+
+
+def test_trend_levels(tmp_path):
+    store = store_ppl_in_hdf5(test_files / "FC1_rev01.tpl", tmp_path / "tpl.h5")
+    with h5py.File(store, "r") as hdf5:
+        raw, times = hdf5["trends"][...], hdf5["time"][...]
+        levels = sorted(hdf5["pyramid/trends"], key=int)
+        assert levels == ["1", "2"]
+        for level in levels:
+            assert_level_matches_blocks(raw, times, hdf5[f"pyramid/trends/{level}"])
+
+
+def test_profile_levels_with_node_blocks(tmp_path):
+    store = store_ppl_in_hdf5(test_files / "FC1_rev01.ppl", tmp_path / "ppl.h5", pyramid=False)
+    with h5py.File(store, "a") as hdf5:
+        build_pyramid(hdf5, factor=2, min_rows=1, min_nodes=64, block_rows=2)
+        raw, times = hdf5["branches/old_offshore/section"][...], hdf5["time"][...]
+        group = hdf5["pyramid/branches/old_offshore/section"]
+        assert [int(group[k].attrs["node_block"]) for k in sorted(group, key=int)] == [2, 4, 4]
+        for level in group:
+            assert_level_matches_blocks(raw, times, group[level])
+
+
+def test_overview_picks_the_coarsest_sufficient_level(tmp_path):
+    store_ppl_in_hdf5(test_files / "FC1_rev01.tpl", tmp_path / "FC1_rev01.tpl.h5")
+    tpl = open_TPL(test_files / "FC1_rev01.tpl")
+    c = tpl.catalog[3]
+    column = tpl.column(c.symbol, c.location)
+    with h5py.File(tmp_path / "FC1_rev01.tpl.h5", "r") as hdf5:
+        coarse = overview(hdf5, "trends", 100, column=column)
+        assert coarse["time"].shape[0] == hdf5["pyramid/trends/2"]["time"].shape[0]
+        np.testing.assert_array_equal(coarse["max"], hdf5["pyramid/trends/2/max"][:, column])
+        fine = overview(hdf5, "trends", 500, t0=0.0, t1=60000.0, column=column)
+        assert fine["time"][0, 0] <= 0.0 and fine["time"][-1, 1] >= 60000.0 - 4 * 60.05
+        raw = overview(hdf5, "trends", 2000, t0=0.0, t1=60000.0, column=column)
+        np.testing.assert_array_equal(raw["mean"], c.data[tpl.time_range(0.0, 60000.0)])
+
+
+def test_appended_rows_make_the_pyramid_stale(tmp_path):
+    partial = tmp_path / "FC1_rev01.tpl"
+    data = truncated_copy(test_files / "FC1_rev01.tpl", partial, 0.6)
+    store_ppl_in_hdf5(partial, tmp_path / "store.h5", follow=True)
+    plot = open_TPL(partial, follow=True)
+    partial.write_bytes(data)
+    plot.refresh(store=tmp_path / "store.h5")
+    with h5py.File(tmp_path / "store.h5", "r") as hdf5:
+        assert not is_current(hdf5)
+        result = overview(hdf5, "trends", 10, column=0)
+        np.testing.assert_array_equal(result["mean"], plot.values[:, 0])
+    with h5py.File(tmp_path / "store.h5", "a") as hdf5:
+        build_pyramid(hdf5)
+        assert is_current(hdf5)
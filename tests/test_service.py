@@ -0,0 +1,42 @@
+import asyncio
+import os
+import shutil
+from concurrent.futures import ProcessPoolExecutor
+
+from src import service
+from src.cli import convert_file
+from src.service import IngestService
+from tests.helpers import test_files
+
+
+def convert_or_die(path, *args):
+    # a conversion that kills its worker, as the OOM killer or a crash would
+    if "dies" in path:
+        os._exit(1)
+    return convert_file(path, *args)
+
+
+def test_a_dead_worker_fails_only_its_own_job(tmp_path, monkeypatch):
+    monkeypatch.setattr(service, "convert_file", convert_or_die)
+    (tmp_path / "in").mkdir()
+    paths = [str(tmp_path / "in" / name) for name in ["a.tpl", "dies.tpl", "b.tpl", "c.ppl"]]
+    for path in paths:
+        shutil.copy(test_files / ("FC1_rev01" + path[-4:]), path)
+    ingest = IngestService(tmp_path / "in", cache=tmp_path / "cache", jobs=2)
+
+    async def run():
+        ingest.queue = asyncio.Queue()
+        ingest._pool = ProcessPoolExecutor(max_workers=ingest.jobs)
+        for path in paths:
+            ingest.jobs_by_path[path] = {"state": "queued"}
+            ingest.queue.put_nowait(path)
+        workers = [asyncio.create_task(ingest._work()) for _ in range(ingest.jobs)]
+        await ingest.queue.join()
+        for worker in workers:
+            worker.cancel()
+        ingest._pool.shutdown()
+
+    asyncio.run(run())
+    states = {os.path.basename(path): job["state"] for path, job in ingest.jobs_by_path.items()}
+    assert states == {"a.tpl": "done", "dies.tpl": "failed", "b.tpl": "done", "c.ppl": "done"}
+    assert "BrokenProcessPool" in ingest.jobs_by_path[paths[1]]["error"]
@@ -0,0 +1,45 @@
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pytest
+
+from src.shared import attach, publish, published, unpublish
+from src.stu_flo import open_PPL, open_TPL
+from tests.helpers import test_files
+
+
+def attached_sum(name, directory):
+    return float(attach(name, directory).branch("old_offshore")["PT"].sum())
+
+
+def test_attach_matches_the_published_plot(tmp_path):
+    shared = tmp_path / "shared"
+    ppl = open_PPL(test_files / "FC1_rev01.ppl")
+    publish(ppl, "ppl", shared)
+    attached = attach("ppl", shared)
+    assert attached.title == ppl.title and attached.date == ppl.date
+    np.testing.assert_array_equal(attached.times, ppl.times)
+    for b, a in zip(ppl.branches, attached.branches):
+        np.testing.assert_array_equal(a.positions("SECTION"), b.positions("SECTION"))
+    for c in ppl.catalog:
+        np.testing.assert_array_equal(attached._item(c.symbol, c.branch).data, c.data)
+    with pytest.raises(ValueError):
+        attached.branch("old_offshore")["PT"][0, 0] = 0.0
+    with ProcessPoolExecutor(max_workers=1) as pool:
+        assert pool.submit(attached_sum, "ppl", shared).result() == float(ppl.branch("old_offshore")["PT"].sum())
+
+    eager = open_TPL(test_files / "FC1_rev01.tpl")
+    with open_TPL(test_files / "FC1_rev01.tpl", lazy=True, cache=tmp_path / "cache") as lazy:
+        publish(lazy, "tpl", shared)
+    tpl = attach("tpl", shared)
+    np.testing.assert_array_equal(tpl.values, eager.values)
+    c = eager.catalog[4]
+    np.testing.assert_array_equal(tpl.get(c.symbol, c.location), c.data)
+    assert sorted(published(shared)) == ["ppl", "tpl"]
+
+    # republishing leaves an attached copy readable
+    publish(open_PPL(test_files / "FC1_rev01.ppl", variables=["PT"]), "ppl", shared)
+    np.testing.assert_array_equal(attached.branch("old_offshore")["PT"], ppl.branch("old_offshore")["PT"])
+    unpublish("ppl", shared)
+    with pytest.raises(Exception, match="No case ppl"):
+        attach("ppl", shared)
@@ -0,0 +1,217 @@
+import shutil
+
+import h5py
+import numpy as np
+import pytest
+
+from src.stu_flo import (
+    Cache,
+    PlotIndex,
+    catalog_widths,
+    iter_records,
+    load_index,
+    open_PPL,
+    open_TPL,
+    store_ppl_in_hdf5,
+)
+from tests.helpers import assert_stores_equal, ppl_files, reference_time_series, test_files, truncated_copy
+
+
+@pytest.mark.parametrize("name", ppl_files)
+def test_ppl_matches_reference(name):
+    ppl = open_PPL(test_files / name)
+    times, values = reference_time_series(test_files / name, catalog_widths(ppl.branches, ppl.catalog))
+    np.testing.assert_array_equal(ppl.times, times)
+    parsed = np.hstack([ppl._item(c.symbol, c.branch).data for c in ppl.catalog])
+    np.testing.assert_array_equal(parsed, values)
+
+
+def test_records_resume_from_offset():
+    steps = [r for r in iter_records(test_files / "FC1_rev01.ppl") if type(r).__name__ == "TimeStep"]
+    resumed = [r for r in iter_records(test_files / "FC1_rev01.ppl", steps[2].end) if type(r).__name__ == "TimeStep"]
+    assert [r.time for r in resumed] == [r.time for r in steps[3:]]
+    assert [r.block for r in resumed] == [r.block for r in steps[3:]]
+
+
+def test_tpl_matches_reference():
+    tpl = open_TPL(test_files / "FC1_rev01.tpl")
+    times, values = reference_time_series(test_files / "FC1_rev01.tpl", [1] * len(tpl.catalog))
+    np.testing.assert_array_equal(tpl.times, times)
+    np.testing.assert_array_equal(tpl.values, values)
+    frame = tpl.to_frame()
+    assert list(frame.columns) == list(tpl.columns)
+    np.testing.assert_array_equal(frame.to_numpy(), values)
+
+
+@pytest.mark.parametrize("name", ["FC1_rev01.ppl", "FC1_rev01.tpl"])
+def test_append_matches_full_conversion(tmp_path, name):
+    partial = tmp_path / name
+    data = truncated_copy(test_files / name, partial, 0.6)
+    store_ppl_in_hdf5(partial, tmp_path / "appended.h5", follow=True)
+    partial.write_bytes(data)
+    store_ppl_in_hdf5(partial, tmp_path / "appended.h5", append=True)
+    store_ppl_in_hdf5(test_files / name, tmp_path / "full.h5")
+    assert_stores_equal(tmp_path / "appended.h5", tmp_path / "full.h5")
+    with h5py.File(tmp_path / "appended.h5", "r") as hdf5:
+        assert hdf5.attrs["source_offset"] == len(data)
+
+
+@pytest.mark.parametrize("name", ["FC1_rev01.ppl", "FC1_rev01.tpl"])
+def test_lazy_store_matches_parse(tmp_path, name):
+    opener = open_TPL if name.endswith(".tpl") else open_PPL
+    eager = opener(test_files / name)
+    with opener(test_files / name, lazy=True, cache=tmp_path) as lazy:
+        np.testing.assert_array_equal(lazy.times, eager.times)
+        for c in eager.catalog:
+            np.testing.assert_array_equal(np.asarray(lazy._item(c.symbol, lazy._location(c)).data), c.data)
+
+
+def test_lazy_indexing_matches_eager(tmp_path):
+    eager = open_PPL(test_files / "FC1_rev01.ppl")
+    with open_PPL(test_files / "FC1_rev01.ppl", lazy=True, cache=tmp_path) as lazy:
+        for key in [(Ellipsis, 2), (2, Ellipsis), Ellipsis, (slice(1, 4), Ellipsis, 3), 3, (1, 2)]:
+            e = eager.branch("old_offshore")["PT"][key]
+            lz = lazy.branch("old_offshore")["PT"][key]
+            assert np.shape(lz) == np.shape(e)
+            np.testing.assert_array_equal(lz, e)
+
+
+def test_cache_converts_once_and_keeps_each_dtype(tmp_path):
+    source = tmp_path / "FC1_rev01.tpl"
+    shutil.copy(test_files / "FC1_rev01.tpl", source)
+    cache = Cache(tmp_path / "cache")
+    float64 = cache.get(source)
+    mtime = float64.stat().st_mtime_ns
+    assert cache.get(source) == float64 and float64.stat().st_mtime_ns >= mtime
+    float32 = cache.get(source, np.float32)
+    assert float64 != float32
+    cache.get(source)
+    assert float64.exists() and float32.exists()
+    source.write_bytes(source.read_bytes() + b"\n")
+    assert cache.get(source) != float64 and not float64.exists() and float32.exists()
+
+
+def test_get_windows(tmp_path):
+    ppl = open_PPL(test_files / "FC1_rev01.ppl")
+    positions = ppl.branch("old_offshore").positions("SECTION")
+    x0, x1 = positions[10], positions[40]
+    times, x, values = ppl.get("PT", "old_offshore", t0=36000.0, t1=144000.0, x0=x0, x1=x1, axes=True)
+    rows = (ppl.times >= 36000.0) & (ppl.times <= 144000.0)
+    columns = (positions >= x0) & (positions <= x1)
+    np.testing.assert_array_equal(times, ppl.times[rows])
+    np.testing.assert_array_equal(x, positions[columns])
+    np.testing.assert_array_equal(values, ppl._item("PT", "old_offshore").data[rows][:, columns])
+    with open_PPL(test_files / "FC1_rev01.ppl", lazy=True, cache=tmp_path) as lazy:
+        np.testing.assert_array_equal(lazy.get("PT", "old_offshore", t0=36000.0, t1=144000.0, x0=x0, x1=x1), values)
+
+    tpl = open_TPL(test_files / "FC1_rev01.tpl")
+    c = tpl.catalog[5]
+    times, values = tpl.get(c.symbol, c.location, t0=600.0, t1=1200.0, axes=True)
+    rows = (tpl.times >= 600.0) & (tpl.times <= 1200.0)
+    np.testing.assert_array_equal(times, tpl.times[rows])
+    np.testing.assert_array_equal(values, c.data[rows])
+    assert len(tpl.get(c.symbol, c.location, t0=1e9)) == 0
+
+
+@pytest.mark.parametrize("name", ["FC1_rev01.ppl", "FC1_rev01.tpl"])
+def test_refresh_matches_full_parse(tmp_path, name):
+    opener = open_TPL if name.endswith(".tpl") else open_PPL
+    partial = tmp_path / name
+    data = truncated_copy(test_files / name, partial, 0.6)
+    store_ppl_in_hdf5(partial, tmp_path / "refreshed.h5", follow=True)
+    plot = opener(partial, follow=True)
+    partial.write_bytes(data)
+    plot.refresh(store=tmp_path / "refreshed.h5")
+
+    full = opener(test_files / name)
+    np.testing.assert_array_equal(plot.times, full.times)
+    for c in full.catalog:
+        np.testing.assert_array_equal(plot._item(c.symbol, plot._location(c)).data, c.data)
+    store_ppl_in_hdf5(test_files / name, tmp_path / "full.h5")
+    assert_stores_equal(tmp_path / "refreshed.h5", tmp_path / "full.h5")
+
+
+def test_refresh_with_time_window_keeps_store_resumable(tmp_path):
+    partial = tmp_path / "FC1_rev01.tpl"
+    data = truncated_copy(test_files / "FC1_rev01.tpl", partial, 0.6)
+    store_ppl_in_hdf5(partial, tmp_path / "refreshed.h5", follow=True)
+    plot = open_TPL(partial, follow=True, t_end=100000.0)
+    partial.write_bytes(data)
+    plot.refresh(store=tmp_path / "refreshed.h5")
+    assert plot.times[-1] <= 100000.0
+    store_ppl_in_hdf5(partial, tmp_path / "refreshed.h5", append=True)
+    store_ppl_in_hdf5(test_files / "FC1_rev01.tpl", tmp_path / "full.h5")
+    assert_stores_equal(tmp_path / "refreshed.h5", tmp_path / "full.h5")
+
+
+def test_failed_refresh_loses_no_time_steps(tmp_path):
+    partial = tmp_path / "FC1_rev01.ppl"
+    data = truncated_copy(test_files / "FC1_rev01.ppl", partial, 0.6)
+    plot = open_PPL(partial, follow=True)
+    n_before = len(plot.times)
+    partial.write_bytes(data)
+    # a store of another case: its catalog does not match
+    store_ppl_in_hdf5(test_files / "FC1_rev01.tpl", tmp_path / "other.h5")
+    with pytest.raises(Exception, match="does not match"):
+        plot.refresh(store=tmp_path / "other.h5")
+    assert len(plot.times) == n_before
+    full = open_PPL(test_files / "FC1_rev01.ppl")
+    np.testing.assert_array_equal(plot.refresh(), full.times[n_before:])
+    np.testing.assert_array_equal(plot.branch("old_offshore")["PT"], full.branch("old_offshore")["PT"])
+
+    selected = open_PPL(partial, variables=["PT"])
+    with pytest.raises(Exception, match="every variable"):
+        selected.refresh(store=tmp_path / "other.h5")
+
+
+def test_partial_loading_matches_full_parse():
+    full = open_PPL(test_files / "FC1_rev01.ppl")
+    part = open_PPL(
+        test_files / "FC1_rev01.ppl", variables=["PT", "GT"], branches=["old_offshore"], t_start=36000.0, t_end=144000.0
+    )
+    rows = (full.times >= 36000.0) & (full.times <= 144000.0)
+    np.testing.assert_array_equal(part.times, full.times[rows])
+    assert sorted((c.symbol, c.branch) for c in part.catalog) == [("GT", "old_offshore"), ("PT", "old_offshore")]
+    for c in part.catalog:
+        np.testing.assert_array_equal(c.data, full._item(c.symbol, c.branch).data[rows])
+
+    tpl = open_TPL(test_files / "FC1_rev01.tpl")
+    wanted = tpl.catalog[3]
+    part = open_TPL(test_files / "FC1_rev01.tpl", variables=[wanted.symbol], locations=[wanted.location], t_end=600.0)
+    rows = tpl.times <= 600.0
+    assert [(c.symbol, c.location) for c in part.catalog] == [(wanted.symbol, wanted.location)]
+    np.testing.assert_array_equal(part.times, tpl.times[rows])
+    np.testing.assert_array_equal(part.catalog[0].data, wanted.data[rows])
+
+
+def test_plot_index_rebuild_after_truncation(tmp_path):
+    source = tmp_path / "FC1_rev01.ppl"
+    shutil.copy(test_files / "FC1_rev01.ppl", source)
+    index = PlotIndex(source).build()
+    blocks, steps = list(index.blocks), len(index)
+    data = truncated_copy(test_files / "FC1_rev01.ppl", source, 0.5)
+    index.update()
+    assert index.blocks == blocks and len(index) < steps
+    source.write_bytes(data)
+    index.update()
+    assert index.blocks == blocks and len(index) == steps
+
+
+def test_plot_index_rebuild_after_rewrite_to_a_larger_file(tmp_path):
+    source = tmp_path / "FC1_rev01.tpl"
+    truncated_copy(test_files / "FC1_rev01.tpl", source, 0.5)
+    assert len(load_index(source)) < 3001
+    # a re-run of the case: a longer title shifts every offset
+    source.write_bytes((test_files / "FC1_rev01.tpl").read_bytes().replace(b"'mytitle'", b"'mytitle rerun'"))
+    tpl = open_TPL(source, header_only=True)
+    full = open_TPL(test_files / "FC1_rev01.tpl")
+    time, values = tpl.read_step(5)
+    assert time == full.times[5]
+    np.testing.assert_array_equal(values, full.values[5])
+    np.testing.assert_array_equal(open_TPL(source, parallel=2).values, full.values)
+
+
+def test_plot_index_without_a_writable_sidecar(tmp_path):
+    index = load_index(test_files / "FC1_rev01.ppl", tmp_path / "missing" / "FC1_rev01.ppl.idx.npz")
+    assert len(index) == 6
+    assert not (tmp_path / "missing").exists()
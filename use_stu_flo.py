@@ -42,7 +42,12 @@ bch = d.sample()["branch"].values[0]
 print(f"\n\nShow all rows where 'symbol' == '{sym}' and 'branch' == '{bch}'...")
 print(f"\n{d[(d['symbol']==sym) & (d['branch']==bch)]}")
 
-# then filter out just the time series data and convert to a numpy array...
+# or ask for the (time, position) array directly without scanning the dataframe,
+# optionally restricted to a time window and a stretch of the branch
 print("\n\nThen just the time series data...")
-data = d[(d["symbol"] == sym) & (d["branch"] == bch)].data
-print(f"\n{np.array(data)}\n\n")
+try:
+    print(f"\n{ppl.get(sym, bch)}\n\n")
+    times, positions, data = ppl.get(sym, bch, t0=0.0, x0=0.0, x1=1000.0, axes=True)
+    print(f"Values between 0 m and 1000 m at {positions}:\n{data}\n\n")
+except KeyError as e:
+    print(f"\n{e}\n\n")